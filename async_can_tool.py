@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Waveshare CAN Tool - asyncio edition
+Drives the serial port from the event loop (add_reader/add_writer), so one
+loop can serve several converters, the web API and timers without a
+thread per port
+"""
+
+import asyncio
+import os
+import time
+from typing import AsyncIterator, Optional
+
+import serial
+
+from can_codec import FrameDecoder, encode_frame
+from can_frame import CanFrame
+from event_log import logger, frame_logger, configure_logging
+from waveshare_can_tool import DeviceConfig, FrameType, response_state
+
+
+class AsyncWaveshareCANTool:
+    """Event-loop based counterpart of WaveshareCANTool"""
+
+    def __init__(self, port: str = '/dev/tty.usbserial-1140', queue_size: int = 10000):
+        self.port = port
+        self.config = DeviceConfig()
+        self.serial_conn: Optional[serial.Serial] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.fd: Optional[int] = None
+
+        self.decoder = FrameDecoder(self.config.work_mode)
+        # Created in connect(): before Python 3.10 a queue binds to the loop
+        # current at construction, which may not be the one asyncio.run() starts
+        self.queue_size = queue_size
+        self._frames: Optional[asyncio.Queue] = None
+        self.frames_dropped = 0
+
+        # While an AT command is in flight, received bytes are its response
+        self._response: Optional[bytearray] = None
+        self._response_event: Optional[asyncio.Event] = None
+        self._command_lock: Optional[asyncio.Lock] = None
+
+    @property
+    def is_connected(self) -> bool:
+        return self.fd is not None
+
+    async def connect(self) -> bool:
+        """Open the port and register it with the running event loop"""
+        self.loop = asyncio.get_running_loop()
+        try:
+            self.serial_conn = serial.Serial(
+                port=self.port,
+                baudrate=115200,
+                bytesize=8,
+                parity='N',
+                stopbits=1,
+                timeout=0
+            )
+            # Selector loops only: Windows handles cannot be watched this way
+            self.fd = self.serial_conn.fileno()
+            self.loop.add_reader(self.fd, self._on_readable)
+        except Exception as e:
+            logger.error("✗ Connection failed: %s", e)
+            if self.serial_conn and self.serial_conn.is_open:
+                self.serial_conn.close()
+            self.fd = None
+            return False
+
+        self._command_lock = asyncio.Lock()
+        self._frames = asyncio.Queue(maxsize=self.queue_size)
+        self.decoder.reset(self.config.work_mode)
+        logger.info("✓ Connected to %s", self.port)
+        return True
+
+    async def disconnect(self):
+        """Unregister and close the port, ending any frames() iterators"""
+        if self.fd is not None:
+            self.loop.remove_reader(self.fd)
+            self.loop.remove_writer(self.fd)
+            self.fd = None
+        if self.serial_conn and self.serial_conn.is_open:
+            self.serial_conn.close()
+            logger.info("✓ Disconnected")
+        self._put_frame(None)
+
+    def _on_readable(self):
+        """Reader callback: route bytes to a pending command or the decoder"""
+        ring = self.decoder.ring
+        try:
+            count = os.readv(self.fd, [ring.writable()])
+        except BlockingIOError:
+            return
+        except OSError as e:
+            logger.error("Monitor error: %s", e)
+            self.loop.create_task(self.disconnect())
+            return
+        if not count:
+            logger.error("Monitor error: device reports readiness to read but returned no data")
+            self.loop.create_task(self.disconnect())
+            return
+
+        ring.commit(count)
+        if self._response is not None:
+            self._response += ring.readable()
+            ring.clear()
+            self._response_event.set()
+            return
+
+        for frame in self.decoder.decode(time.monotonic_ns()):
+            self._put_frame(frame)
+
+    def _put_frame(self, frame: Optional[CanFrame]):
+        """Queue a frame for frames(), dropping the oldest when full"""
+        if self._frames is None:
+            return
+        if self._frames.full():
+            self._frames.get_nowait()
+            self.frames_dropped += 1
+        self._frames.put_nowait(frame)
+
+    async def _write(self, data: bytes):
+        """Write all bytes, waiting on add_writer while the fd is full"""
+        view = memoryview(data)
+        while view:
+            try:
+                written = os.write(self.fd, view)
+                view = view[written:]
+                continue
+            except BlockingIOError:
+                pass
+
+            ready = self.loop.create_future()
+            self.loop.add_writer(self.fd, ready.set_result, None)
+            try:
+                await ready
+            finally:
+                self.loop.remove_writer(self.fd)
+
+    async def send_command(self, command: str, wait_response: bool = True,
+                           timeout: float = 2.0, quiet_gap: float = 0.02) -> Optional[str]:
+        """Send an AT command and await its response
+
+        Returns as soon as an OK/ERROR line arrives, or once a complete
+        line has been followed by quiet_gap seconds of silence.
+        """
+        if not self.is_connected:
+            logger.error("✗ Not connected to device")
+            return None
+
+        async with self._command_lock:
+            self._response = bytearray()
+            self._response_event = asyncio.Event()
+            try:
+                await self._write(f"{command}\r\n".encode('utf-8'))
+                if not wait_response:
+                    return "OK"
+
+                deadline = self.loop.time() + timeout
+                while True:
+                    final, line_complete = response_state(self._response)
+                    if final:
+                        break
+
+                    remaining = deadline - self.loop.time()
+                    wait = min(remaining, quiet_gap) if line_complete else remaining
+                    if wait <= 0:
+                        break
+
+                    self._response_event.clear()
+                    try:
+                        await asyncio.wait_for(self._response_event.wait(), wait)
+                    except asyncio.TimeoutError:
+                        if line_complete:
+                            break
+
+                return self._response.decode('utf-8', errors='ignore').strip() or None
+            except Exception as e:
+                logger.error("✗ Command failed: %s", e)
+                return None
+            finally:
+                self._response = None
+
+    async def send_can_frame(self, can_id: int, data: bytes, extended: bool = False) -> bool:
+        """Send CAN frame"""
+        if not self.is_connected:
+            return False
+
+        try:
+            extended = extended or self.config.can_frame_type == FrameType.EXTENDED
+            await self._write(encode_frame(self.config.work_mode, can_id, data, extended))
+            return True
+        except Exception as e:
+            logger.error("✗ CAN frame send failed: %s", e)
+            return False
+
+    async def frames(self) -> AsyncIterator[CanFrame]:
+        """Yield received frames until the tool is disconnected"""
+        queue = self._frames
+        if queue is None:
+            return
+        while True:
+            frame = await queue.get()
+            if frame is None:
+                return
+            yield frame
+
+
+async def _monitor(port: str, duration: float):
+    """Small CLI demo: print decoded frames for a while"""
+    tool = AsyncWaveshareCANTool(port)
+    if not await tool.connect():
+        return 1
+
+    async def stop_later():
+        await asyncio.sleep(duration)
+        await tool.disconnect()
+
+    stopper = asyncio.create_task(stop_later())
+    async for frame in tool.frames():
+        frame_logger.info("RX: ID=%s, Data=%s", frame.id_text, frame.data.hex())
+    await stopper
+    return 0
+
+
+def main():
+    """Main function for command-line interface"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Waveshare CAN Tool - asyncio monitor")
+    parser.add_argument('--port', default='/dev/tty.usbserial-1140', help='Serial port')
+    parser.add_argument('--duration', type=float, default=10.0, help='Monitoring time in seconds')
+    args = parser.parse_args()
+    configure_logging()
+
+    return asyncio.run(_monitor(args.port, args.duration))
+
+
+if __name__ == "__main__":
+    exit(main())
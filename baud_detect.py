@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Passive UART baud-rate inference
+Listens to an active link at a few candidate rates without transmitting
+anything and scores each rate by framing errors (where the OS reports
+them), by how many bytes look like mis-sampled bit runs, and by how much
+of the stream parses as converter frames or text
+"""
+
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+try:
+    import termios
+except ImportError:
+    termios = None
+
+from can_codec import FrameDecoder, WorkMode
+from serial_reader import SerialReader
+
+
+CANDIDATE_RATES = (115200, 9600, 57600, 38400, 19200, 230400, 460800, 921600)
+
+# A byte sampled at the wrong rate mostly shows up as a run of ones
+# following a run of zeros (the start bit smeared over several bits)
+RUN_BYTES = frozenset((0x00, 0x80, 0xC0, 0xE0, 0xF0, 0xF8, 0xFC, 0xFE, 0xFF))
+RUN_BYTES_EXPECTED = len(RUN_BYTES) / 256
+
+# Modes whose framing can be checked; transparent data has none
+STRUCTURED_MODES = (WorkMode.FORMAT_CONVERSION, WorkMode.TRANSPARENT_WITH_ID)
+
+
+class BaudScore(NamedTuple):
+    """How plausible the bytes heard at one rate are (score 0..1)"""
+    baud: int
+    score: float
+    nbytes: int
+    error_rate: float  # framing errors per byte (0 where not reported)
+    run_excess: float  # share of mis-sampling bytes beyond what random data has
+    structure: float  # share of bytes that form frames or text lines
+    mode: Optional[str] = None  # best-parsing WorkMode name, or 'TEXT'
+
+
+def split_error_marks(raw: bytes) -> Tuple[bytes, int]:
+    """Undo termios PARMRK escaping: (data, framing/parity error count)
+
+    0xFF 0xFF is a literal 0xFF, 0xFF 0x00 X a byte received with an error.
+    """
+    if b'\xff' not in raw:
+        return raw, 0
+    data = bytearray()
+    errors = 0
+    index = 0
+    end = len(raw)
+    while index < end:
+        byte = raw[index]
+        if byte != 0xFF or index + 1 >= end:
+            data.append(byte)
+            index += 1
+        elif raw[index + 1] == 0xFF:
+            data.append(0xFF)
+            index += 2
+        elif raw[index + 1] == 0x00 and index + 2 < end:
+            errors += 1
+            index += 3
+        else:
+            data.append(byte)
+            index += 1
+    return bytes(data), errors
+
+
+def structure_ratio(data: bytes) -> Tuple[float, Optional[str]]:
+    """Largest share of data that parses as converter frames or text lines"""
+    if not data:
+        return 0.0, None
+    best, best_mode = 0.0, None
+    for mode in STRUCTURED_MODES:
+        decoder = FrameDecoder(mode)
+        decoder.feed(data)
+        # A partial frame at the end of the sample is not held against it
+        pending = decoder.ring.end - decoder.ring.start
+        ratio = (len(data) - decoder.bytes_discarded - pending) / len(data)
+        if decoder.frames_decoded and ratio > best:
+            best, best_mode = ratio, mode.name
+    text = sum(1 for byte in data if 32 <= byte <= 126 or byte in (9, 10, 13)) / len(data)
+    if b'\n' in data and text > best:
+        best, best_mode = text, 'TEXT'
+    return best, best_mode
+
+
+def score_sample(baud: int, data: bytes, errors: int = 0, duration: float = 0.0) -> BaudScore:
+    """Score bytes heard at baud; errors are framing errors from split_error_marks"""
+    nbytes = len(data)
+    if not nbytes:
+        return BaudScore(baud, 0.0, 0, 0.0, 0.0, 0.0)
+    error_rate = errors / (nbytes + errors)
+    runs = sum(1 for byte in data if byte in RUN_BYTES) / nbytes
+    run_excess = max(0.0, (runs - RUN_BYTES_EXPECTED) / (1 - RUN_BYTES_EXPECTED))
+    structure, mode = structure_ratio(data)
+
+    # Parsed structure is strong evidence; byte statistics decide otherwise
+    plausibility = max(structure, 1.0 - 2 * run_excess)
+    score = max(0.0, plausibility) * (1.0 - error_rate) ** 2
+    # More bytes than the rate can carry: sampled far too fast
+    if duration > 0 and nbytes > 1.2 * duration * baud / 10 + 16:
+        score = 0.0
+    return BaudScore(baud, score, nbytes, error_rate, run_excess, structure, mode)
+
+
+class PassiveBaudDetector:
+    """Sniffs an open pyserial port at candidate rates, never writing to it
+
+    Frames in flight when the rate changes are dropped, then each rate
+    listens for `window` seconds (longer while fewer than min_bytes have
+    arrived, up to max_window). A rate scoring at least `accept` ends the
+    sweep early.
+    """
+
+    def __init__(self, serial_conn, candidates: Sequence[int] = CANDIDATE_RATES,
+                 window: float = 0.04, max_window: float = 0.12, min_bytes: int = 24,
+                 accept: float = 0.9):
+        self.serial_conn = serial_conn
+        self.candidates = tuple(candidates)
+        self.window = window
+        self.max_window = max_window
+        self.min_bytes = min_bytes
+        self.accept = accept
+        self.scores: List[BaudScore] = []
+
+    def _mark_errors(self) -> bool:
+        """Ask the tty driver to flag framing errors in the stream (POSIX)"""
+        if termios is None:
+            return False
+        try:
+            fd = self.serial_conn.fileno()
+            attrs = termios.tcgetattr(fd)
+            attrs[0] |= termios.PARMRK | termios.INPCK
+            attrs[0] &= ~(termios.IGNPAR | termios.ISTRIP | termios.IGNBRK | termios.BRKINT)
+            termios.tcsetattr(fd, termios.TCSANOW, attrs)
+            return True
+        except (AttributeError, OSError, ValueError, termios.error):
+            return False
+
+    def listen(self, baud: int) -> BaudScore:
+        """Switch to baud and score what arrives"""
+        conn = self.serial_conn
+        conn.baudrate = baud  # pyserial rewrites termios, clearing PARMRK
+        marked = self._mark_errors()
+        conn.reset_input_buffer()
+        reader = SerialReader(conn)
+
+        raw = bytearray()
+        start = time.monotonic()
+        deadline = start + self.window
+        hard_deadline = start + self.max_window
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                if len(raw) >= self.min_bytes or now >= hard_deadline:
+                    break
+                deadline = hard_deadline
+            raw += reader.read_until_deadline(deadline)
+        elapsed = time.monotonic() - start
+
+        data, errors = split_error_marks(bytes(raw)) if marked else (bytes(raw), 0)
+        return score_sample(baud, data, errors, elapsed)
+
+    def detect(self) -> Optional[BaudScore]:
+        """Best-scoring rate (None if the link is silent); restores the rate otherwise"""
+        original = self.serial_conn.baudrate
+        self.scores = []
+        try:
+            for baud in self.candidates:
+                result = self.listen(baud)
+                self.scores.append(result)
+                if result.score >= self.accept and result.nbytes >= self.min_bytes:
+                    break
+        finally:
+            best = self.best
+            self.serial_conn.baudrate = best.baud if best else original
+        return best
+
+    @property
+    def best(self) -> Optional[BaudScore]:
+        heard = [s for s in self.scores if s.nbytes >= self.min_bytes and s.score > 0]
+        return max(heard, key=lambda s: s.score) if heard else None
+
+    def report(self) -> List[Dict[str, Any]]:
+        return [s._asdict() for s in self.scores]
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Live bus-load estimator
+Accumulates received and transmitted traffic in one-second buckets and
+reports CAN bus utilisation (against can_baud, with expected bit
+stuffing), UART utilisation (against uart_baud), frames/s and bytes/s
+over sliding 1 s / 10 s / 60 s windows
+"""
+
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+from can_codec import MAX_DLC
+from can_frame import RECORD, FRAME_DTYPE, FLAG_EXTENDED, np
+from can_timing import expected_frame_bits, uart_bits_per_byte
+
+
+WINDOWS = (1, 10, 60)
+DIRECTIONS = ('rx', 'tx')
+
+# Expected bus bits per frame, indexed [extended][dlc]
+_FRAME_BITS = [[expected_frame_bits(dlc, extended) for dlc in range(16)]
+               for extended in (False, True)]
+
+
+def payload_bits(length: int, extended: bool = False):
+    """(frames, expected bus bits) for a payload split into CAN frames"""
+    full, rest = divmod(length, MAX_DLC)
+    bits = full * _FRAME_BITS[extended][MAX_DLC]
+    if rest or not length:
+        return full + 1, bits + _FRAME_BITS[extended][rest]
+    return full, bits
+
+
+class BusLoadEstimator:
+    """Sliding-window traffic statistics per direction
+
+    Counters go into the bucket of the current whole second; a window of
+    N seconds sums the last N completed buckets, so every figure is
+    stable for a full second and costs O(N) to read.
+    """
+
+    def __init__(self, config, history: int = max(WINDOWS)):
+        self.config = config
+        self.history = history
+        self._lock = threading.Lock()
+        # second -> {direction: [frames, payload bytes, bus bits, uart bytes]}
+        self._buckets: Dict[int, Dict[str, list]] = {}
+
+    def _bucket(self, direction: str, now: Optional[float] = None) -> list:
+        second = int(time.monotonic() if now is None else now)
+        bucket = self._buckets.get(second)
+        if bucket is None:
+            bucket = self._buckets[second] = {d: [0, 0, 0.0, 0] for d in DIRECTIONS}
+            for old in [s for s in self._buckets if s <= second - self.history - 1]:
+                del self._buckets[old]
+        return bucket[direction]
+
+    def add(self, direction: str, frames: int, payload_bytes: int, bus_bits: float,
+            uart_bytes: int, now: Optional[float] = None):
+        with self._lock:
+            counters = self._bucket(direction, now)
+            counters[0] += frames
+            counters[1] += payload_bytes
+            counters[2] += bus_bits
+            counters[3] += uart_bytes
+
+    def add_payload(self, direction: str, length: int, extended: bool, uart_bytes: int):
+        """Account one transmitted payload; transparent payloads span 8-byte frames"""
+        frames, bits = payload_bits(length, extended)
+        self.add(direction, frames, length, bits, uart_bytes)
+
+    def add_records(self, direction: str, records, uart_bytes: int):
+        """Account packed decoder records (see can_frame.RECORD)"""
+        count = len(records) // RECORD.size
+        if not count:
+            self.add(direction, 0, 0, 0.0, uart_bytes)
+            return
+        if np is not None:
+            array = np.frombuffer(records, dtype=FRAME_DTYPE)
+            dlcs = np.minimum(array['dlc'], MAX_DLC)
+            extended = (array['flags'] & FLAG_EXTENDED).astype(bool)
+            bits = float(np.asarray(_FRAME_BITS)[extended.astype(int), dlcs].sum())
+            payload = int(dlcs.sum())
+        else:
+            bits = payload = 0
+            for _, _, flags, dlc, _, _ in RECORD.iter_unpack(records):
+                dlc = min(dlc, MAX_DLC)
+                bits += _FRAME_BITS[bool(flags & FLAG_EXTENDED)][dlc]
+                payload += dlc
+        self.add(direction, count, payload, bits, uart_bytes)
+
+    def add_frames(self, direction: str, frames: Iterable, uart_bytes: int):
+        """Account CanFrame objects"""
+        count = payload = 0
+        bits = 0.0
+        for frame in frames:
+            dlc = min(frame.dlc, MAX_DLC)
+            count += 1
+            payload += dlc
+            bits += _FRAME_BITS[frame.extended][dlc]
+        self.add(direction, count, payload, bits, uart_bytes)
+
+    def window(self, seconds: int, now: Optional[float] = None) -> Dict[str, Any]:
+        """Rates over the last `seconds` completed seconds"""
+        current = int(time.monotonic() if now is None else now)
+        totals = {d: [0, 0, 0.0, 0] for d in DIRECTIONS}
+        with self._lock:
+            for second in range(current - seconds, current):
+                bucket = self._buckets.get(second)
+                if bucket:
+                    for direction in DIRECTIONS:
+                        for index, value in enumerate(bucket[direction]):
+                            totals[direction][index] += value
+
+        config = self.config
+        uart_bit_rate = config.uart_baud / uart_bits_per_byte(
+            config.uart_data_bits, config.uart_stop_bits, config.uart_parity)
+        result: Dict[str, Any] = {}
+        for direction in DIRECTIONS:
+            frames, payload, bits, uart_bytes = totals[direction]
+            result[direction] = {
+                'frames_per_s': frames / seconds,
+                'bytes_per_s': payload / seconds,
+                'uart_load': uart_bytes / seconds / uart_bit_rate,
+            }
+        # The bus is shared by both directions; the UART is full duplex
+        bus_bits = totals['rx'][2] + totals['tx'][2]
+        result['bus_load'] = bus_bits / seconds / config.can_baud
+        return result
+
+    def snapshot(self, windows: Sequence[int] = WINDOWS) -> Dict[str, Any]:
+        """All windows at once, e.g. for the web API"""
+        now = time.monotonic()
+        return {f"{seconds}s": self.window(seconds, now) for seconds in windows}
+
+    def summary(self, seconds: int = 1) -> str:
+        """One-line text for status bars and the CLI"""
+        stats = self.window(seconds)
+        return (f"Bus {stats['bus_load']:.1%} | RX {stats['rx']['frames_per_s']:.0f} fr/s "
+                f"{stats['rx']['bytes_per_s']:.0f} B/s | TX {stats['tx']['frames_per_s']:.0f} fr/s "
+                f"{stats['tx']['bytes_per_s']:.0f} B/s | UART {stats['rx']['uart_load']:.0%}/"
+                f"{stats['tx']['uart_load']:.0%}")
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
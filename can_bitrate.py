@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+CAN bit-rate autodetection
+Steps the converter through the standard CAN rates with AT+CAN= and, at
+each one, counts the valid frames and garbage bytes it forwards while
+listening. Nothing is transmitted: a CAN controller at the wrong rate
+passes on no valid frames, so the rate at which frames arrive cleanly
+is the bus rate.
+"""
+
+import time
+from typing import List, NamedTuple, Optional, Sequence
+
+from can_codec import FrameDecoder, WorkMode
+from event_log import logger
+from serial_reader import SerialReader
+
+
+# Most common rates first so a typical bus is found on the first steps
+STANDARD_BITRATES = (500000, 250000, 125000, 1000000, 800000, 100000, 50000, 20000, 10000)
+
+# Modes whose output has frame boundaries the decoder can check; in the
+# others every byte is payload, so a wrong rate cannot be told apart
+FRAMED_MODES = (WorkMode.TRANSPARENT_WITH_ID, WorkMode.FORMAT_CONVERSION)
+
+
+class BitrateSample(NamedTuple):
+    """What was received during the dwell at one rate"""
+    bitrate: int
+    frames: int
+    garbage: int  # bytes the decoder had to discard
+    dwell: float  # seconds listened
+    configured: bool  # the device acknowledged AT+CAN=
+
+    @property
+    def valid_ratio(self) -> float:
+        """Frames against frames plus discarded bytes (0 if silent)"""
+        return self.frames / (self.frames + self.garbage) if self.frames else 0.0
+
+
+class BitrateDetection(NamedTuple):
+    bitrate: Optional[int]
+    confidence: float  # 0..1
+    samples: List[BitrateSample]
+
+
+def _evidence(sample: BitrateSample, min_frames: int) -> float:
+    """0..1: full once min_frames clean frames have arrived"""
+    return sample.valid_ratio * min(1.0, sample.frames / max(min_frames, 1))
+
+
+def detect_can_bitrate(tool, candidates: Sequence[int] = STANDARD_BITRATES, dwell: float = 0.25,
+                       max_dwell: float = 1.0, min_frames: int = 5,
+                       min_valid_ratio: float = 0.9) -> BitrateDetection:
+    """Find the bus rate by listening at each candidate rate
+
+    tool is a connected WaveshareCANTool that is not monitoring. Each rate
+    is heard for `dwell` seconds, extended up to max_dwell while some but
+    fewer than min_frames frames have arrived. The sweep stops at the
+    first rate with min_frames frames and at least min_valid_ratio of them
+    clean. The winner stays configured (not saved). If nothing is heard,
+    the original rate is restored.
+
+    In TRANSPARENT and MODBUS_RTU mode the device is switched to
+    FORMAT_CONVERSION for the sweep and back afterwards.
+
+    The AT set has no listen-only switch. Whether the controller ACKs or
+    flags errors while tuned to a wrong rate depends on the converter.
+    """
+    if tool.is_monitoring:
+        raise RuntimeError("Stop monitoring before detecting the CAN bit rate")
+    mode = tool.config.work_mode
+    if mode in FRAMED_MODES:
+        return _sweep(tool, candidates, dwell, max_dwell, min_frames, min_valid_ratio)
+
+    if not tool.set_work_mode(WorkMode.FORMAT_CONVERSION):
+        raise RuntimeError(f"Bit-rate detection needs a framed work mode; "
+                           f"could not switch from {mode.name}")
+    try:
+        return _sweep(tool, candidates, dwell, max_dwell, min_frames, min_valid_ratio)
+    finally:
+        if not tool.set_work_mode(mode):
+            logger.error("✗ Could not restore work mode %s after bit-rate detection", mode.name)
+
+
+def _sweep(tool, candidates: Sequence[int], dwell: float, max_dwell: float, min_frames: int,
+           min_valid_ratio: float) -> BitrateDetection:
+    """detect_can_bitrate() with the device already in a framed mode"""
+    original = tool.config.can_baud
+    frame_type = tool.config.can_frame_type
+    reader = SerialReader(tool.serial_conn)
+    samples: List[BitrateSample] = []
+    start = time.monotonic()
+
+    for bitrate in candidates:
+        configured = tool.configure_can(bitrate, frame_type)
+        # Whatever arrived at the previous rate or with the reply is stale
+        tool.serial_conn.reset_input_buffer()
+        decoder = FrameDecoder(tool.config.work_mode)
+        listen_start = time.monotonic()
+        deadline = listen_start + dwell
+        hard_deadline = listen_start + max_dwell
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                if not 0 < decoder.frames_decoded < min_frames or now >= hard_deadline:
+                    break
+                deadline = hard_deadline
+            if decoder.frames_decoded >= min_frames:
+                break
+            ring = decoder.ring
+            count = reader.readinto(ring.writable(), timeout=min(0.05, deadline - now))
+            if count:
+                ring.commit(count)
+                decoder.decode_records()
+
+        sample = BitrateSample(bitrate, decoder.frames_decoded, decoder.bytes_discarded,
+                               time.monotonic() - listen_start, configured)
+        samples.append(sample)
+        logger.debug("CAN %s bps: %s frames, %s garbage bytes in %.0f ms", bitrate,
+                     sample.frames, sample.garbage, sample.dwell * 1000)
+        if sample.frames >= min_frames and sample.valid_ratio >= min_valid_ratio:
+            break
+
+    scored = sorted(samples, key=lambda s: _evidence(s, min_frames), reverse=True)
+    best = scored[0] if scored and scored[0].frames else None
+    if best is None:
+        tool.configure_can(original, frame_type)
+        logger.warning("⚠ No CAN traffic heard at any rate (%.1f s)", time.monotonic() - start)
+        return BitrateDetection(None, 0.0, samples)
+
+    # Frames heard at another rate as well make the answer less certain
+    runner_up = _evidence(scored[1], min_frames) if len(scored) > 1 else 0.0
+    confidence = _evidence(best, min_frames) * (1.0 - runner_up)
+    if samples[-1].bitrate != best.bitrate:
+        tool.configure_can(best.bitrate, frame_type)
+    logger.info("✓ CAN bit rate %s bps (confidence %.0f%%, %.1f s)",
+                best.bitrate, confidence * 100, time.monotonic() - start)
+    return BitrateDetection(best.bitrate, confidence, samples)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Binary CAN capture format
+Fixed-size 24-byte records behind a small header holding the DeviceConfig
+snapshot. Captures are written in the background through LogWriter and can
+be opened instantly as a memory-mapped NumPy structured array.
+
+Layout (little endian):
+  header  : magic, version, record size, config length,
+            wall-clock anchor (ns), monotonic anchor (ns)
+  config  : DeviceConfig as JSON, zero padded to a multiple of 8 bytes
+  records : timestamp (monotonic ns), id, flags, dlc, channel, data[8]
+
+A record with FLAG_GAP set marks a reconnect: nothing was received for
+the number of nanoseconds in its data field before its timestamp.
+"""
+
+import json
+import os
+import struct
+from dataclasses import asdict
+from enum import Enum
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from can_codec import SessionClock
+from can_frame import RECORD, FRAME_DTYPE, FrameBatch, gap_record, np
+from log_writer import LogWriter
+
+
+MAGIC = b'WSCANCAP'
+VERSION = 1
+
+HEADER = struct.Struct('<8sHHIqq')
+
+# Records are the can_frame layout, so batches are written as-is
+RECORD_DTYPE = FRAME_DTYPE
+
+
+def _config_json(config) -> bytes:
+    """Serialise a DeviceConfig with enums stored by value"""
+    values = {
+        key: value.value if isinstance(value, Enum) else value
+        for key, value in asdict(config).items()
+    }
+    return json.dumps(values, sort_keys=True).encode('utf-8')
+
+
+def build_header(config, wall_anchor_ns: int, mono_anchor_ns: int) -> bytes:
+    """Return the file header for a capture of the given configuration"""
+    config_bytes = _config_json(config)
+    padding = -(HEADER.size + len(config_bytes)) % 8
+    return (HEADER.pack(MAGIC, VERSION, RECORD.size, len(config_bytes),
+                        wall_anchor_ns, mono_anchor_ns)
+            + config_bytes + b'\0' * padding)
+
+
+class CaptureWriter:
+    """Appends decoded frames to a binary capture file"""
+
+    def __init__(self, path: str, config, clock: Optional[SessionClock] = None, **writer_options):
+        self.path = path
+        self.clock = clock or SessionClock()
+        header = build_header(config, self.clock.wall_anchor_ns, self.clock.mono_anchor_ns)
+        self.writer = LogWriter(path, header=header, **writer_options)
+        self.frames_written = 0
+
+    def start(self):
+        self.writer.start()
+
+    def write_frames(self, frames: Iterable) -> bool:
+        """Queue records for CanFrame objects"""
+        frames = list(frames)
+        records = bytearray(RECORD.size * len(frames))
+        for index, frame in enumerate(frames):
+            frame.pack_into(records, index * RECORD.size)
+        return self.write_records(records)
+
+    def write_batch(self, batch: FrameBatch) -> bool:
+        """Queue a FrameBatch in one piece"""
+        return self.write_records(batch.tobytes())
+
+    def write_records(self, records) -> bool:
+        """Queue packed records, e.g. from FrameDecoder.decode_records()"""
+        if not records:
+            return True
+        count = len(records) // RECORD.size
+        if not self.writer.write(bytes(records)):
+            return False
+        self.frames_written += count
+        return True
+
+    def write_gap(self, lost_ns: int, resumed_ns: int, channel: int = 0) -> bool:
+        """Record that reception was interrupted between the two timestamps"""
+        return self.writer.write(gap_record(lost_ns, resumed_ns, channel))
+
+    @property
+    def dropped(self) -> int:
+        return self.writer.dropped
+
+    def close(self):
+        self.writer.close()
+
+
+def read_header(path: str) -> Dict[str, Any]:
+    """Parse a capture header; 'data_offset' is where records start"""
+    with open(path, 'rb') as f:
+        fixed = f.read(HEADER.size)
+        if len(fixed) < HEADER.size:
+            raise ValueError(f"{path}: truncated capture header")
+        magic, version, record_size, config_len, wall_ns, mono_ns = HEADER.unpack(fixed)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not a CAN capture file")
+        if version != VERSION or record_size != RECORD.size:
+            raise ValueError(f"{path}: unsupported capture version {version}")
+        config = json.loads(f.read(config_len).decode('utf-8'))
+
+    padding = -(HEADER.size + config_len) % 8
+    return {
+        'version': version,
+        'record_size': record_size,
+        'config': config,
+        'wall_anchor_ns': wall_ns,
+        'mono_anchor_ns': mono_ns,
+        'data_offset': HEADER.size + config_len + padding,
+    }
+
+
+def load_batch(path: str) -> Tuple[Dict[str, Any], FrameBatch]:
+    """Read a whole capture into a FrameBatch"""
+    header, records = open_capture(path)
+    return header, FrameBatch.from_records(records)
+
+
+def open_capture(path: str) -> Tuple[Dict[str, Any], Any]:
+    """Memory-map a capture as a NumPy structured array (read-only)
+
+    Nothing is parsed or copied up front, so multi-gigabyte files open
+    instantly; a partially written final record is ignored.
+    """
+    if np is None:
+        raise ImportError("NumPy is required to read captures: pip install numpy")
+
+    header = read_header(path)
+    count = (os.path.getsize(path) - header['data_offset']) // RECORD.size
+    if count <= 0:
+        return header, np.zeros(0, dtype=RECORD_DTYPE)
+    records = np.memmap(path, dtype=RECORD_DTYPE, mode='r',
+                        offset=header['data_offset'], shape=(count,))
+    return header, records
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+CAN frame codec for the Waveshare serial protocol
+Encodes outgoing frames and incrementally decodes the received byte stream
+for each device work mode
+"""
+
+import operator
+import struct
+import time
+from datetime import datetime
+from enum import Enum
+from typing import List, Optional
+
+from can_frame import RECORD, FLAG_EXTENDED, FLAG_NO_ID, CanFrame, FrameBatch, frame_flags
+
+
+class WorkMode(Enum):
+    """Device working modes"""
+    TRANSPARENT = 1
+    TRANSPARENT_WITH_ID = 2
+    FORMAT_CONVERSION = 3
+    MODBUS_RTU = 4
+
+
+# TRANSPARENT_WITH_ID: little-endian ID word followed by a DLC byte,
+# the same header layout as SocketCAN's struct can_frame
+ID_HEADER = struct.Struct('<IB')
+ID_EXTENDED_FLAG = 0x80000000
+ID_RESERVED_BITS = 0x60000000
+
+# FORMAT_CONVERSION: 0xAA | info | ID (2 or 4 bytes LE) | data | 0x55
+# info = 0xC0 | extended << 5 | remote << 4 | dlc
+# (a remote frame has no data bytes between ID and 0x55)
+FRAME_HEAD = 0xAA
+FRAME_TAIL = 0x55
+INFO_MARKER = 0xC0
+INFO_EXTENDED = 0x20
+INFO_REMOTE = 0x10
+INFO_DLC_MASK = 0x0F
+
+STANDARD_ID_MAX = 0x7FF
+EXTENDED_ID_MAX = 0x1FFFFFFF
+MAX_DLC = 8
+
+
+class SessionClock:
+    """Wall-clock anchor for monotonic frame timestamps
+
+    Frames are stamped with time.monotonic_ns(), which never jumps when NTP
+    steps the system clock. One (wall, monotonic) pair taken at session
+    start converts them to wall-clock time, and only when displaying or
+    exporting.
+    """
+
+    def __init__(self):
+        self.wall_anchor_ns = time.time_ns()
+        self.mono_anchor_ns = time.monotonic_ns()
+
+    def to_wall_ns(self, timestamp_ns: int) -> int:
+        """Wall-clock time in ns for a monotonic timestamp"""
+        return self.wall_anchor_ns + (timestamp_ns - self.mono_anchor_ns)
+
+    def to_datetime(self, timestamp_ns: int) -> datetime:
+        return datetime.fromtimestamp(self.to_wall_ns(timestamp_ns) / 1e9)
+
+    def format(self, timestamp_ns: int, fmt: str = "%H:%M:%S.%f") -> str:
+        """Format like the monitor display (milliseconds resolution)"""
+        return self.to_datetime(timestamp_ns).strftime(fmt)[:-3]
+
+
+def encode_frame(mode: WorkMode, can_id: int, data: bytes, extended: bool = False,
+                 remote: bool = False, dlc: Optional[int] = None) -> bytes:
+    """Encode one CAN frame for transmission in the given work mode"""
+    out = bytearray()
+    encode_frame_into(out, mode, can_id, data, extended, remote, dlc)
+    return bytes(out)
+
+
+def encode_frame_into(out: bytearray, mode: WorkMode, can_id: int, data: bytes,
+                      extended: bool = False, remote: bool = False,
+                      dlc: Optional[int] = None) -> int:
+    """Append one encoded CAN frame to out; returns the encoded length
+
+    Uses the same layout per mode that FrameDecoder reads. A remote frame
+    (FORMAT_CONVERSION only) carries dlc, default len(data), and no data.
+    """
+    if mode in (WorkMode.TRANSPARENT, WorkMode.MODBUS_RTU):
+        # The converter packs the raw serial bytes into CAN frames itself
+        out += data
+        return len(data)
+
+    if len(data) > MAX_DLC:
+        raise ValueError(f"CAN payload too long: {len(data)} bytes")
+    try:
+        can_id = operator.index(can_id)
+    except TypeError:
+        raise ValueError(f"{mode.name} mode needs an integer CAN ID, got {can_id!r}") from None
+    if can_id < 0 or can_id > (EXTENDED_ID_MAX if extended else STANDARD_ID_MAX):
+        raise ValueError(f"CAN ID out of range: 0x{can_id:X}")
+
+    start = len(out)
+    if mode == WorkMode.TRANSPARENT_WITH_ID:
+        if remote:
+            raise ValueError("TRANSPARENT_WITH_ID mode cannot send remote frames")
+        id_word = (can_id | ID_EXTENDED_FLAG) if extended else can_id
+        out += ID_HEADER.pack(id_word, len(data))
+        out += data
+    else:
+        length = len(data) if dlc is None else dlc
+        if not 0 <= length <= MAX_DLC:
+            raise ValueError(f"Invalid DLC: {length}")
+        info = INFO_MARKER | length | (INFO_REMOTE if remote else 0)
+        if extended:
+            out += struct.pack('<BBI', FRAME_HEAD, info | INFO_EXTENDED, can_id)
+        else:
+            out += struct.pack('<BBH', FRAME_HEAD, info, can_id)
+        if not remote:
+            out += data
+        out.append(FRAME_TAIL)
+    return len(out) - start
+
+
+class RxRingBuffer:
+    """Preallocated receive buffer filled in place by readinto()
+
+    Readers write into writable() and commit() the byte count; the decoder
+    parses readable() and consume()s whole frames. Instead of wrapping
+    around, the small unconsumed tail (at most one partial frame) is moved
+    back to the front when the end is reached, so every frame stays
+    contiguous for struct.unpack_from and no per-read objects are created.
+    """
+
+    def __init__(self, capacity: int = 65536):
+        self.buffer = bytearray(capacity)
+        self.view = memoryview(self.buffer)
+        self.start = 0
+        self.end = 0
+        self.overflows = 0
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def clear(self):
+        """Discard all buffered bytes"""
+        self.start = self.end = 0
+
+    def writable(self) -> memoryview:
+        """Free space after the buffered bytes, compacting if needed"""
+        if self.end == len(self.buffer):
+            pending = self.end - self.start
+            if self.start == 0:
+                # Nothing was consumed from a full buffer: drop it and resync
+                self.overflows += 1
+                pending = 0
+            else:
+                self.buffer[:pending] = self.view[self.start:self.end]
+            self.start = 0
+            self.end = pending
+        return self.view[self.end:]
+
+    def commit(self, count: int):
+        """Mark count bytes written into writable() as received"""
+        self.end += count
+
+    def readable(self) -> memoryview:
+        """View of the buffered, not yet consumed bytes"""
+        return self.view[self.start:self.end]
+
+    def consume(self, count: int):
+        """Release count bytes from the front of the buffer"""
+        self.start += count
+        if self.start == self.end:
+            self.start = self.end = 0
+
+
+class FrameDecoder:
+    """Resumable decoder turning received bytes into CAN frames
+
+    Bytes land in the decoder's RxRingBuffer, either copied in by feed() or
+    read straight into ring.writable() by the caller followed by a decode
+    call. Complete frames are returned as soon as they are available and
+    partial frames are kept until the rest arrives. Parsing works in place
+    on the buffer and resumes at the saved position, so bytes belonging to
+    frames already returned are never scanned again.
+
+    Frames are decoded into packed RECORD bytes; decode() turns them into
+    CanFrame objects, decode_batch() appends them to a FrameBatch without
+    creating any per-frame objects.
+    """
+
+    def __init__(self, mode: WorkMode = WorkMode.TRANSPARENT, ring: Optional[RxRingBuffer] = None):
+        self.mode = mode
+        self.ring = ring if ring is not None else RxRingBuffer()
+        self._records = bytearray(RECORD.size * 1024)
+        # Stamped into every record to tell devices apart (see device_manager)
+        self.channel = 0
+
+        # Counters, e.g. for link diagnostics
+        self.frames_decoded = 0
+        self.bytes_discarded = 0
+
+    def reset(self, mode: Optional[WorkMode] = None):
+        """Drop any partial frame, optionally switching work mode"""
+        if mode is not None:
+            self.mode = mode
+        self.ring.clear()
+
+    def feed(self, data: bytes, timestamp_ns: Optional[int] = None) -> List[CanFrame]:
+        """Consume received bytes and return every frame completed by them"""
+        frames = []
+        data = memoryview(data)
+        offset = 0
+        # Loop only matters for inputs larger than the ring itself
+        while offset < len(data):
+            free = self.ring.writable()
+            count = min(len(free), len(data) - offset)
+            free[:count] = data[offset:offset + count]
+            self.ring.commit(count)
+            offset += count
+            frames += self.decode(timestamp_ns)
+        return frames
+
+    def decode(self, timestamp_ns: Optional[int] = None) -> List[CanFrame]:
+        """Decode the bytes already committed to the ring buffer
+
+        timestamp_ns should be time.monotonic_ns() taken when the bytes were
+        read; it defaults to now.
+        """
+        return [CanFrame.from_record(record)
+                for record in RECORD.iter_unpack(self.decode_records(timestamp_ns))]
+
+    def decode_batch(self, timestamp_ns: Optional[int] = None,
+                     batch: Optional[FrameBatch] = None) -> FrameBatch:
+        """Like decode(), but append the frames to a FrameBatch (NumPy required)"""
+        if batch is None:
+            batch = FrameBatch()
+        batch.extend_records(self.decode_records(timestamp_ns))
+        return batch
+
+    def decode_records(self, timestamp_ns: Optional[int] = None) -> memoryview:
+        """Decode into packed RECORD bytes
+
+        The returned view is reused by the next decode call; copy it (or
+        hand it to a writer) before decoding again.
+        """
+        if timestamp_ns is None:
+            timestamp_ns = time.monotonic_ns()
+
+        ring = self.ring
+        # Worst case is one record per 5 bytes (0xAA, info, 2-byte ID, 0x55)
+        needed = RECORD.size * ((ring.end - ring.start) // 5 + 1)
+        if len(self._records) < needed:
+            self._records = bytearray(needed)
+
+        if self.mode in (WorkMode.TRANSPARENT, WorkMode.MODBUS_RTU):
+            count, pos = self._split_raw(ring.buffer, ring.start, ring.end, timestamp_ns)
+        elif self.mode == WorkMode.TRANSPARENT_WITH_ID:
+            count, pos = self._decode_with_id(ring.buffer, ring.start, ring.end, timestamp_ns)
+        else:
+            count, pos = self._decode_format_conversion(ring.buffer, ring.start, ring.end, timestamp_ns)
+
+        # Only a partial frame stays behind in the ring
+        ring.consume(pos - ring.start)
+        self.frames_decoded += count
+        return memoryview(self._records)[:count * RECORD.size]
+
+    def _split_raw(self, buf: bytearray, pos: int, end: int, timestamp_ns: int):
+        """Transparent modes carry no header: split into 8-byte payloads"""
+        out = self._records
+        count = 0
+        while pos < end:
+            chunk_end = min(pos + MAX_DLC, end)
+            RECORD.pack_into(out, count * RECORD.size, timestamp_ns, 0, FLAG_NO_ID,
+                             chunk_end - pos, self.channel, buf[pos:chunk_end])
+            count += 1
+            pos = chunk_end
+        return count, pos
+
+    def _decode_with_id(self, buf: bytearray, pos: int, end: int, timestamp_ns: int):
+        """Decode <ID word><DLC><data> records"""
+        out = self._records
+        count = 0
+        header_size = ID_HEADER.size
+
+        while end - pos >= header_size:
+            id_word, dlc = ID_HEADER.unpack_from(buf, pos)
+            extended = bool(id_word & ID_EXTENDED_FLAG)
+            can_id = id_word & EXTENDED_ID_MAX
+            if (dlc > MAX_DLC or id_word & ID_RESERVED_BITS
+                    or (not extended and can_id > STANDARD_ID_MAX)):
+                # Not a plausible header: slip one byte and resynchronise
+                pos += 1
+                self.bytes_discarded += 1
+                continue
+
+            frame_end = pos + header_size + dlc
+            if frame_end > end:
+                break
+            RECORD.pack_into(out, count * RECORD.size, timestamp_ns, can_id,
+                             FLAG_EXTENDED if extended else 0, dlc, self.channel,
+                             buf[pos + header_size:frame_end])
+            count += 1
+            pos = frame_end
+
+        return count, pos
+
+    def _decode_format_conversion(self, buf: bytearray, pos: int, end: int, timestamp_ns: int):
+        """Decode 0xAA ... 0x55 delimited records"""
+        out = self._records
+        count = 0
+
+        while pos < end:
+            if buf[pos] != FRAME_HEAD:
+                head = buf.find(FRAME_HEAD, pos, end)
+                skipped_to = end if head < 0 else head
+                self.bytes_discarded += skipped_to - pos
+                pos = skipped_to
+                continue
+
+            if end - pos < 2:
+                break
+            info = buf[pos + 1]
+            dlc = info & INFO_DLC_MASK
+            if info & INFO_MARKER != INFO_MARKER or dlc > MAX_DLC:
+                pos += 1
+                self.bytes_discarded += 1
+                continue
+
+            extended = bool(info & INFO_EXTENDED)
+            remote = bool(info & INFO_REMOTE)
+            id_size = 4 if extended else 2
+            # A remote frame carries its DLC but no data bytes
+            size = 0 if remote else dlc
+            frame_end = pos + 2 + id_size + size + 1
+            if frame_end > end:
+                break
+            if buf[frame_end - 1] != FRAME_TAIL:
+                pos += 1
+                self.bytes_discarded += 1
+                continue
+
+            id_start = pos + 2
+            if extended:
+                can_id = struct.unpack_from('<I', buf, id_start)[0] & EXTENDED_ID_MAX
+            else:
+                can_id = struct.unpack_from('<H', buf, id_start)[0] & STANDARD_ID_MAX
+            data_start = id_start + id_size
+            RECORD.pack_into(out, count * RECORD.size, timestamp_ns, can_id,
+                             frame_flags(can_id, extended, remote), dlc, self.channel,
+                             buf[data_start:data_start + size])
+            count += 1
+            pos = frame_end
+
+        return count, pos
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Software acceptance filter
+Compiles whitelist / blacklist entries (single IDs, ranges and id/mask
+pairs) into constant-time lookups: a 2048-entry table for standard IDs
+and a hash set plus merged intervals for extended IDs. Applied to packed
+decoder records before any frame objects, display or logging.
+
+Entry formats (windows_config.json monitoring.filters):
+  0x123 or "0x123"          single ID
+  "0x100-0x1FF"             inclusive range
+  "0x100/0x7F0"             id/mask pair, matches if (ID & mask) == (id & mask)
+  {"id": ..., "mask": ...}  or {"from": ..., "to": ...}
+"""
+
+import bisect
+import heapq
+import itertools
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+from can_codec import STANDARD_ID_MAX, EXTENDED_ID_MAX
+from can_frame import RECORD, FRAME_DTYPE, FLAG_EXTENDED, FLAG_NO_ID, np
+
+
+STANDARD_ID_COUNT = STANDARD_ID_MAX + 1
+
+FilterEntry = Union[int, str, Dict[str, Any]]
+
+
+def _parse_int(value: Union[int, str]) -> int:
+    return value if isinstance(value, int) else int(value.strip(), 0)
+
+
+def parse_entry(entry: FilterEntry) -> Tuple[str, int, int]:
+    """Normalise one entry to ('range', low, high) or ('mask', id, mask)"""
+    if isinstance(entry, dict):
+        if 'mask' in entry:
+            kind, first, second = 'mask', _parse_int(entry['id']), _parse_int(entry['mask'])
+        elif 'from' in entry:
+            kind, first, second = 'range', _parse_int(entry['from']), _parse_int(entry['to'])
+        else:
+            value = _parse_int(entry['id'])
+            kind, first, second = 'range', value, value
+    elif isinstance(entry, str) and '/' in entry:
+        can_id, mask = entry.split('/', 1)
+        kind, first, second = 'mask', _parse_int(can_id), _parse_int(mask)
+    elif isinstance(entry, str) and '-' in entry.strip()[1:]:
+        low, high = entry.strip().split('-', 1)
+        kind, first, second = 'range', _parse_int(low), _parse_int(high)
+    else:
+        value = _parse_int(entry)
+        kind, first, second = 'range', value, value
+
+    if kind == 'range' and not 0 <= first <= second <= EXTENDED_ID_MAX:
+        raise ValueError(f"Invalid CAN ID filter entry: {entry!r}")
+    if kind == 'mask':
+        if not (0 <= first <= EXTENDED_ID_MAX and 0 <= second <= EXTENDED_ID_MAX):
+            raise ValueError(f"Invalid CAN ID filter entry: {entry!r}")
+        first &= second
+    return kind, first, second
+
+
+class IdSet:
+    """Compiled set of CAN IDs
+
+    Standard IDs live in a 2048-entry table. Extended IDs are checked
+    against a hash set of single IDs, merged sorted intervals (bisect)
+    and the id/mask pairs. An ID is matched by value, whatever the frame
+    type.
+    """
+
+    # Ranges up to this size are expanded into the hash set
+    EXPAND_LIMIT = 64
+
+    def __init__(self, entries: Iterable[FilterEntry] = ()):
+        self.standard = bytearray(STANDARD_ID_COUNT)
+        self.extended_ids = set()
+        self.masks: List[Tuple[int, int]] = []
+        ranges = []
+
+        for entry in entries:
+            kind, first, second = parse_entry(entry)
+            if kind == 'mask':
+                self.masks.append((first, second))
+                for can_id in range(STANDARD_ID_COUNT):
+                    if can_id & second == first:
+                        self.standard[can_id] = 1
+                continue
+
+            low, high = first, second
+            for can_id in range(low, min(high, STANDARD_ID_MAX) + 1):
+                self.standard[can_id] = 1
+            if high - low < self.EXPAND_LIMIT:
+                self.extended_ids.update(range(low, high + 1))
+            else:
+                ranges.append((low, high))
+
+        # Merge overlapping / adjacent intervals for bisect lookups
+        ranges.sort()
+        merged: List[List[int]] = []
+        for low, high in ranges:
+            if merged and low <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], high)
+            else:
+                merged.append([low, high])
+        self.range_starts = [low for low, _ in merged]
+        self.range_ends = [high for _, high in merged]
+        self.empty = not (any(self.standard) or self.extended_ids or self.masks or merged)
+
+    def contains(self, can_id: int, extended: bool) -> bool:
+        if not extended and can_id < STANDARD_ID_COUNT:
+            return bool(self.standard[can_id])
+        if can_id in self.extended_ids:
+            return True
+        index = bisect.bisect_right(self.range_starts, can_id) - 1
+        if index >= 0 and can_id <= self.range_ends[index]:
+            return True
+        return any(can_id & mask == value for value, mask in self.masks)
+
+    def contains_extended(self, ids):
+        """Vectorised contains(id, extended=True) over a NumPy array of IDs"""
+        hit = np.isin(ids, np.fromiter(self.extended_ids, dtype=np.uint32,
+                                       count=len(self.extended_ids)))
+        if self.range_starts:
+            index = np.searchsorted(self.range_starts, ids, side='right') - 1
+            ends = np.asarray(self.range_ends, dtype=np.uint32)
+            hit |= (index >= 0) & (ids <= ends[np.maximum(index, 0)])
+        for value, mask in self.masks:
+            hit |= (ids & mask) == value
+        return hit
+
+
+class FrameFilter:
+    """Whitelist / blacklist acceptance filter
+
+    A frame passes if the whitelist is empty or contains its ID, and the
+    blacklist does not. Transparent-mode payloads carry no ID and always
+    pass.
+    """
+
+    def __init__(self, whitelist: Iterable[FilterEntry] = (), blacklist: Iterable[FilterEntry] = ()):
+        self.whitelist = IdSet(whitelist)
+        self.blacklist = IdSet(blacklist)
+        self.passed = 0
+        self.rejected = 0
+
+        # Both lists folded into one table for standard IDs
+        self._standard = bytearray(
+            (self.whitelist.empty or allowed) and not blocked
+            for allowed, blocked in zip(self.whitelist.standard, self.blacklist.standard))
+        self._table = None
+        if np is not None:
+            self._table = np.frombuffer(bytes(self._standard), dtype=np.uint8).astype(bool)
+
+    @classmethod
+    def from_config(cls, filters: Dict[str, Any]) -> Optional['FrameFilter']:
+        """Build from a windows_config.json 'monitoring.filters' section (None if disabled)"""
+        if not filters.get('enabled', False):
+            return None
+        return cls(filters.get('whitelist', []), filters.get('blacklist', []))
+
+    def accepts(self, can_id: Optional[int], extended: bool = False) -> bool:
+        if can_id is None:
+            return True
+        if not extended and can_id < STANDARD_ID_COUNT:
+            return bool(self._standard[can_id])
+        return ((self.whitelist.empty or self.whitelist.contains(can_id, True))
+                and not self.blacklist.contains(can_id, True))
+
+    def mask(self, records):
+        """Boolean pass mask for a FRAME_DTYPE array"""
+        ids = records['id']
+        flags = records['flags']
+        extended = (flags & FLAG_EXTENDED).astype(bool)
+        passed = np.ones(len(records), dtype=bool)
+
+        standard = ~extended & ((flags & FLAG_NO_ID) == 0)
+        passed[standard] = self._table[ids[standard] & STANDARD_ID_MAX]
+        if extended.any():
+            ext_ids = ids[extended]
+            ext_pass = ~self.blacklist.contains_extended(ext_ids)
+            if not self.whitelist.empty:
+                ext_pass &= self.whitelist.contains_extended(ext_ids)
+            passed[extended] = ext_pass
+        return passed
+
+    def filter_records(self, records) -> Union[bytes, memoryview]:
+        """Drop rejected frames from packed RECORD bytes"""
+        count = len(records) // RECORD.size
+        if not count:
+            return records
+
+        if np is not None:
+            array = np.frombuffer(records, dtype=FRAME_DTYPE)
+            passed = self.mask(array)
+            kept = int(passed.sum())
+            self.passed += kept
+            self.rejected += count - kept
+            return records if kept == count else array[passed].tobytes()
+
+        kept = bytearray()
+        for offset in range(0, count * RECORD.size, RECORD.size):
+            _, can_id, flags, _, _, _ = RECORD.unpack_from(records, offset)
+            if self.accepts(None if flags & FLAG_NO_ID else can_id, bool(flags & FLAG_EXTENDED)):
+                kept += records[offset:offset + RECORD.size]
+        self.passed += len(kept) // RECORD.size
+        self.rejected += count - len(kept) // RECORD.size
+        return kept
+
+    def apply(self, batch):
+        """Filtered copy of a FrameBatch"""
+        passed = self.mask(batch.array)
+        self.passed += int(passed.sum())
+        self.rejected += len(batch) - int(passed.sum())
+        return batch.select(passed)
+
+
+class FilterPlan(NamedTuple):
+    """Hardware id/mask pairs chosen for a set of wanted IDs"""
+    pairs: List[Tuple[int, int]]
+    wanted_ids: int
+    accepted_ids: int   # IDs in the whole ID space the pairs let through
+    pass_rate: Optional[float]  # share of observed traffic passed, if traffic was given
+    wanted_rate: Optional[float]  # share of observed traffic that is actually wanted
+
+    @property
+    def extra_ids(self) -> int:
+        return self.accepted_ids - self.wanted_ids
+
+
+def _accepted_count(pairs: List[Tuple[int, int]], width: int) -> int:
+    """Number of IDs accepted by the union of id/mask pairs (inclusion-exclusion)"""
+    full = (1 << width) - 1
+    total = 0
+    for size in range(1, len(pairs) + 1):
+        for group in itertools.combinations(pairs, size):
+            value, mask = group[0]
+            compatible = True
+            for other_value, other_mask in group[1:]:
+                if (value ^ other_value) & mask & other_mask:
+                    compatible = False
+                    break
+                value |= other_value
+                mask |= other_mask
+            if compatible:
+                total += (-1) ** (size + 1) * (1 << bin(full & ~mask).count('1'))
+    return total
+
+
+# Above this many groups the greedy merge only compares neighbours in ID
+# order until it is down to GREEDY_GROUPS, keeping large ID sets fast
+GREEDY_GROUPS = 128
+
+
+def _merge_groups(groups: List[Tuple[int, int]], target: int, full: int,
+                  neighbours_only: bool) -> List[Tuple[int, int]]:
+    """Greedily merge (value, mask) groups down to target, cheapest merge first
+
+    The cost of a merge is the number of extra IDs it admits. Candidate
+    merges sit in a heap and are dropped lazily once a side has been merged
+    away. neighbours_only considers only groups adjacent in ID order
+    (groups must then be sorted and contiguous), which is O(N log N).
+    """
+    def free(mask: int) -> int:
+        return 1 << bin(full & ~mask).count('1')
+
+    def candidate(i: int, j: int):
+        value_i, mask_i = alive[i]
+        value_j, mask_j = alive[j]
+        mask = mask_i & mask_j & ~(value_i ^ value_j)
+        return (free(mask) - free(mask_i) - free(mask_j), i, j)
+
+    alive = dict(enumerate(groups))
+    if neighbours_only:
+        last = len(groups) - 1
+        prev = {i: i - 1 if i else None for i in alive}
+        following = {i: i + 1 if i < last else None for i in alive}
+        heap = [candidate(i, i + 1) for i in range(len(groups) - 1)]
+    else:
+        heap = [candidate(i, j) for i, j in itertools.combinations(alive, 2)]
+    heapq.heapify(heap)
+
+    next_id = len(groups)
+    while len(alive) > target:
+        _, i, j = heapq.heappop(heap)
+        if i not in alive or j not in alive:
+            continue
+        value_i, mask_i = alive.pop(i)
+        value_j, mask_j = alive.pop(j)
+        mask = mask_i & mask_j & ~(value_i ^ value_j)
+        k = next_id
+        next_id += 1
+        alive[k] = (value_i & mask, mask)
+        if neighbours_only:
+            before, after = prev.pop(i), following.pop(j)
+            del following[i], prev[j]
+            prev[k], following[k] = before, after
+            if before is not None:
+                following[before] = k
+                heapq.heappush(heap, candidate(before, k))
+            if after is not None:
+                prev[after] = k
+                heapq.heappush(heap, candidate(k, after))
+        else:
+            for other in alive:
+                if other != k:
+                    heapq.heappush(heap, candidate(other, k))
+    return list(alive.values())
+
+
+def optimize_hardware_filter(ids: Iterable[int], max_pairs: int = 1, extended: bool = False,
+                             traffic: Optional[Dict[int, float]] = None) -> FilterPlan:
+    """Choose up to max_pairs id/mask pairs accepting every wanted ID
+
+    One pair is exact and linear: the mask keeps only the bits all wanted
+    IDs agree on (set in their AND or clear in their OR), the smallest
+    id/mask superset there is. For several pairs, groups are merged
+    greedily, always taking the merge that admits the fewest extra IDs;
+    large sets are first merged among ID-order neighbours down to
+    GREEDY_GROUPS. traffic maps observed IDs to frame counts or rates and
+    is used to predict the pass-through rate.
+    """
+    wanted = sorted(set(ids))
+    if not wanted:
+        raise ValueError("No CAN IDs given")
+    width = 29 if extended or wanted[-1] > STANDARD_ID_MAX else 11
+    full = (1 << width) - 1
+    if wanted[-1] > full:
+        raise ValueError(f"CAN ID out of range: 0x{wanted[-1]:X}")
+
+    if max_pairs <= 1:
+        all_set, any_set = full, 0
+        for can_id in wanted:
+            all_set &= can_id
+            any_set |= can_id
+        mask = full & (all_set | ~any_set)
+        groups = [(all_set, mask)]
+    else:
+        # Each group is (value, mask); start from one exact pair per ID
+        groups = [(can_id, full) for can_id in wanted]
+        if len(groups) > max(max_pairs, GREEDY_GROUPS):
+            groups = _merge_groups(groups, max(max_pairs, GREEDY_GROUPS), full, True)
+        groups = _merge_groups(groups, max_pairs, full, False)
+
+    pairs = sorted(groups)
+    pass_rate = wanted_rate = None
+    if traffic:
+        total = sum(traffic.values())
+        if total:
+            passed = sum(rate for can_id, rate in traffic.items()
+                         if any(can_id & mask == value for value, mask in pairs))
+            useful = sum(traffic.get(can_id, 0) for can_id in wanted)
+            pass_rate, wanted_rate = passed / total, useful / total
+
+    return FilterPlan(pairs, len(wanted), _accepted_count(pairs, width), pass_rate, wanted_rate)
+
+
+def traffic_from_frames(frames) -> Dict[int, int]:
+    """Per-ID frame counts from CanFrame objects or a FrameBatch"""
+    if hasattr(frames, 'ids') and np is not None:
+        ids, counts = np.unique(frames.ids, return_counts=True)
+        return dict(zip(ids.tolist(), counts.tolist()))
+    counts: Dict[int, int] = {}
+    for frame in frames:
+        if frame.can_id is not None:
+            counts[frame.can_id] = counts.get(frame.can_id, 0) + 1
+    return counts
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+CAN frame containers
+CanFrame is a compact record for single-frame APIs; FrameBatch holds many
+frames in one NumPy structured array for the high-rate paths (decoder,
+log and capture writers, statistics, web API)
+
+Record layout (24 bytes, little endian, shared with the capture format):
+  timestamp (monotonic ns), id, flags, dlc, channel, data[8]
+
+channel tells frames from several converters apart (see device_manager);
+it is 0 for a single device.
+"""
+
+import struct
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+RECORD = struct.Struct('<QIBBH8s')
+
+FLAG_EXTENDED = 0x01
+FLAG_REMOTE = 0x02
+FLAG_NO_ID = 0x04  # transparent modes: the serial stream carries no ID
+FLAG_GAP = 0x08  # not a frame: reception was interrupted (see gap_record)
+
+FRAME_DTYPE = None
+if np is not None:
+    FRAME_DTYPE = np.dtype([
+        ('ts', '<u8'),
+        ('id', '<u4'),
+        ('flags', 'u1'),
+        ('dlc', 'u1'),
+        ('channel', '<u2'),
+        ('data', 'u1', (8,)),
+    ])
+
+
+def gap_record(lost_ns: int, resumed_ns: int, channel: int = 0) -> bytes:
+    """Marker for an interval with no reception, stamped when it ended
+
+    The data field holds the gap length in nanoseconds.
+    """
+    return RECORD.pack(resumed_ns, 0, FLAG_GAP | FLAG_NO_ID, 0, channel,
+                       struct.pack('<Q', max(0, resumed_ns - lost_ns)))
+
+
+def frame_flags(can_id: Optional[int], extended: bool, remote: bool = False) -> int:
+    """Record flags for a frame's attributes"""
+    flags = FLAG_EXTENDED if extended else 0
+    if remote:
+        flags |= FLAG_REMOTE
+    if can_id is None:
+        flags |= FLAG_NO_ID
+    return flags
+
+
+class CanFrame:
+    """One CAN frame; can_id is None for transparent-mode payloads"""
+
+    __slots__ = ('timestamp_ns', 'can_id', 'extended', 'remote', 'dlc', 'data', 'channel')
+
+    def __init__(self, can_id: Optional[int], data: bytes = b'', extended: bool = False,
+                 remote: bool = False, timestamp_ns: int = 0, dlc: Optional[int] = None,
+                 channel: int = 0):
+        self.timestamp_ns = timestamp_ns  # time.monotonic_ns() when the bytes were read
+        self.can_id = can_id
+        self.extended = extended
+        self.remote = remote
+        self.dlc = len(data) if dlc is None else dlc
+        self.data = data
+        self.channel = channel
+
+    @classmethod
+    def from_record(cls, record: tuple) -> 'CanFrame':
+        """Build from an unpacked RECORD tuple"""
+        timestamp_ns, can_id, flags, dlc, channel, data = record
+        payload = b'' if flags & FLAG_REMOTE else data[:min(dlc, 8)]
+        return cls(None if flags & FLAG_NO_ID else can_id, payload,
+                   bool(flags & FLAG_EXTENDED), bool(flags & FLAG_REMOTE), timestamp_ns, dlc, channel)
+
+    @property
+    def flags(self) -> int:
+        return frame_flags(self.can_id, self.extended, self.remote)
+
+    @property
+    def id_text(self) -> str:
+        """ID as shown by the monitors"""
+        return 'unknown' if self.can_id is None else f"0x{self.can_id:03X}"
+
+    def pack_into(self, buffer, offset: int):
+        """Write this frame as a RECORD at offset"""
+        RECORD.pack_into(buffer, offset, self.timestamp_ns, self.can_id or 0,
+                         self.flags, self.dlc, self.channel, self.data)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, CanFrame):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self) -> str:
+        channel = f", channel={self.channel}" if self.channel else ""
+        return (f"CanFrame(id={self.id_text}, extended={self.extended}, "
+                f"dlc={self.dlc}, data={self.data.hex()}, ts={self.timestamp_ns}{channel})")
+
+
+class FrameBatch:
+    """Growable array of frames stored as FRAME_DTYPE records
+
+    Appending packed records (decoder output, capture files) is a single
+    memory copy and column access (batch.ids, batch.timestamps ...) is
+    vectorised; CanFrame objects are only created when iterating.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        if np is None:
+            raise ImportError("NumPy is required for FrameBatch: pip install numpy")
+        self._array = np.zeros(max(capacity, 1), dtype=FRAME_DTYPE)
+        self._count = 0
+
+    @classmethod
+    def from_records(cls, records) -> 'FrameBatch':
+        """Copy packed RECORD bytes (or a FRAME_DTYPE array) into a new batch"""
+        batch = cls(len(records) // RECORD.size if isinstance(records, (bytes, bytearray, memoryview))
+                    else len(records))
+        batch.extend_records(records)
+        return batch
+
+    @classmethod
+    def from_frames(cls, frames) -> 'FrameBatch':
+        frames = list(frames)
+        batch = cls(len(frames))
+        for frame in frames:
+            batch.append(frame)
+        return batch
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def array(self):
+        """The populated records (a view, valid until the batch grows)"""
+        return self._array[:self._count]
+
+    @property
+    def timestamps(self):
+        return self.array['ts']
+
+    @property
+    def ids(self):
+        return self.array['id']
+
+    @property
+    def flags(self):
+        return self.array['flags']
+
+    @property
+    def dlcs(self):
+        return self.array['dlc']
+
+    @property
+    def nbytes(self) -> int:
+        """Total payload bytes"""
+        return int(self.dlcs.sum())
+
+    def clear(self):
+        self._count = 0
+
+    def _reserve(self, count: int):
+        needed = self._count + count
+        if needed > len(self._array):
+            grown = np.zeros(max(needed, 2 * len(self._array)), dtype=FRAME_DTYPE)
+            grown[:self._count] = self._array[:self._count]
+            self._array = grown
+
+    def append(self, frame: CanFrame):
+        self._reserve(1)
+        record = self._array[self._count]
+        record['ts'] = frame.timestamp_ns
+        record['id'] = frame.can_id or 0
+        record['flags'] = frame.flags
+        record['dlc'] = frame.dlc
+        record['channel'] = frame.channel
+        record['data'][:len(frame.data)] = np.frombuffer(frame.data, dtype=np.uint8)
+        self._count += 1
+
+    def extend_records(self, records):
+        """Append packed RECORD bytes or another FRAME_DTYPE array"""
+        if isinstance(records, FrameBatch):
+            records = records.array
+        elif isinstance(records, (bytes, bytearray, memoryview)):
+            records = np.frombuffer(records, dtype=FRAME_DTYPE)
+        self._reserve(len(records))
+        self._array[self._count:self._count + len(records)] = records
+        self._count += len(records)
+
+    def select(self, mask) -> 'FrameBatch':
+        """New batch holding the records where mask is true"""
+        return FrameBatch.from_records(self.array[mask])
+
+    def tobytes(self) -> bytes:
+        """Packed records, ready for a capture file"""
+        return self.array.tobytes()
+
+    def __getitem__(self, index: int) -> CanFrame:
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        return CanFrame.from_record(RECORD.unpack_from(self._array, index * RECORD.size))
+
+    def __iter__(self) -> Iterator[CanFrame]:
+        for record in RECORD.iter_unpack(self.array.tobytes()):
+            yield CanFrame.from_record(record)
+
+    def to_dicts(self, clock=None) -> List[Dict[str, Any]]:
+        """JSON-ready rows for the web API; clock formats the timestamps"""
+        rows = []
+        for frame in self:
+            rows.append({
+                'timestamp': clock.format(frame.timestamp_ns) if clock else frame.timestamp_ns,
+                'id': frame.id_text,
+                'extended': frame.extended,
+                'dlc': frame.dlc,
+                'data': frame.data.hex(),
+                'channel': frame.channel,
+            })
+        return rows
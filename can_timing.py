@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+CAN and UART link timing
+Worst-case frame lengths on the CAN bus (with bit stuffing) and on the
+UART (with start/parity/stop bits and the work-mode framing), and a token
+bucket that paces transmission to what the slower link can carry
+"""
+
+import threading
+import time
+from typing import Any, Dict
+
+from can_codec import WorkMode, ID_HEADER, MAX_DLC
+
+
+# Bits between SOF and the end of the CRC field, the part subject to
+# stuffing, excluding the data field
+STUFFED_OVERHEAD_STANDARD = 34
+STUFFED_OVERHEAD_EXTENDED = 54
+# CRC delimiter, ACK slot + delimiter, EOF and the 3-bit intermission
+FIXED_TRAILER_BITS = 1 + 2 + 7 + 3
+# Stuff bits per stuffed bit for random data (one per ~31 bits); the
+# worst case, one per 4 bits, is what can_frame_bits() assumes
+EXPECTED_STUFF_RATIO = 0.032
+
+
+def can_frame_bits(dlc: int, extended: bool = False, stuffing: bool = True) -> int:
+    """Worst-case bus time of one data frame in bit times, including IFS"""
+    stuffed = (STUFFED_OVERHEAD_EXTENDED if extended else STUFFED_OVERHEAD_STANDARD) + 8 * dlc
+    stuff_bits = (stuffed - 1) // 4 if stuffing else 0
+    return stuffed + stuff_bits + FIXED_TRAILER_BITS
+
+
+def expected_frame_bits(dlc: int, extended: bool = False) -> float:
+    """Average bus time of one data frame, assuming random bits in the stuffed part"""
+    stuffed = (STUFFED_OVERHEAD_EXTENDED if extended else STUFFED_OVERHEAD_STANDARD) + 8 * dlc
+    return stuffed * (1 + EXPECTED_STUFF_RATIO) + FIXED_TRAILER_BITS
+
+
+def uart_frame_bytes(mode: WorkMode, dlc: int, extended: bool = False) -> int:
+    """Serial bytes encode_frame() produces for one CAN frame"""
+    if mode in (WorkMode.TRANSPARENT, WorkMode.MODBUS_RTU):
+        return dlc
+    if mode == WorkMode.TRANSPARENT_WITH_ID:
+        return ID_HEADER.size + dlc
+    return 1 + 1 + (4 if extended else 2) + dlc + 1
+
+
+def uart_bits_per_byte(data_bits: int = 8, stop_bits: int = 1, parity: str = 'N') -> int:
+    """Start bit + data + parity + stop bits"""
+    return 1 + data_bits + (0 if parity.upper() == 'N' else 1) + stop_bits
+
+
+def frame_time(config, dlc: int, extended: bool = False) -> float:
+    """Seconds the slower link (CAN bus or UART) is busy with one frame"""
+    can_time = can_frame_bits(dlc, extended) / config.can_baud
+    uart_time = (uart_frame_bytes(config.work_mode, dlc, extended)
+                 * uart_bits_per_byte(config.uart_data_bits, config.uart_stop_bits, config.uart_parity)
+                 / config.uart_baud)
+    return max(can_time, uart_time)
+
+
+def max_frame_rate(config, dlc: int = MAX_DLC, extended: bool = False) -> float:
+    """Frames per second the link can sustain for frames of this size"""
+    return 1.0 / frame_time(config, dlc, extended)
+
+
+class TxRateLimiter:
+    """Token bucket measured in link time
+
+    Every frame costs its worst-case frame_time(); the bucket refills at
+    utilization seconds per second and holds as much as the converter's
+    transmit buffer (buffer_bytes of serial data) can absorb, so bursts
+    up to the buffer size go out at once and anything beyond is paced to
+    the bus rate.
+    """
+
+    def __init__(self, config, buffer_bytes: int = 4096, utilization: float = 1.0):
+        if not 0 < utilization <= 1:
+            raise ValueError("utilization must be in (0, 1]")
+        self.config = config
+        self.buffer_bytes = buffer_bytes
+        self.utilization = utilization
+
+        self.frames = 0
+        self.bus_time = 0.0  # link seconds consumed
+        self.throttled = 0.0  # seconds spent waiting for tokens
+
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._started = self._last
+
+    @property
+    def capacity(self) -> float:
+        """Link time that fits in the converter buffer"""
+        config = self.config
+        frames = self.buffer_bytes // max(uart_frame_bytes(config.work_mode, MAX_DLC, True), 1)
+        return max(frames, 1) * frame_time(config, MAX_DLC, True)
+
+    def cost(self, length: int, extended: bool = False) -> float:
+        """Link time for a payload; transparent payloads are split into 8-byte frames"""
+        full, rest = divmod(length, MAX_DLC)
+        total = full * frame_time(self.config, MAX_DLC, extended)
+        if rest or not length:
+            total += frame_time(self.config, rest, extended)
+        return total
+
+    def reserve(self, cost: float) -> float:
+        """Take cost from the bucket; returns how long to wait before sending"""
+        with self._lock:
+            now = time.monotonic()
+            capacity = self.capacity
+            self._tokens = min(capacity, self._tokens + (now - self._last) * self.utilization)
+            self._last = now
+            self._tokens -= cost
+            self.frames += 1
+            self.bus_time += cost
+            delay = -self._tokens / self.utilization if self._tokens < 0 else 0.0
+            self.throttled += delay
+            return delay
+
+    def acquire(self, cost: float) -> float:
+        """reserve() and sleep until the frame may be written"""
+        delay = self.reserve(cost)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def stats(self) -> Dict[str, Any]:
+        """Achieved throughput and the link capacity left unused"""
+        elapsed = max(time.monotonic() - self._started, 1e-9)
+        load = self.bus_time / elapsed
+        return {
+            'frames': self.frames,
+            'frames_per_s': self.frames / elapsed,
+            'link_load': load,
+            'headroom': max(0.0, self.utilization - load),
+            'max_frames_per_s': max_frame_rate(self.config) * self.utilization,
+            'throttled_s': self.throttled,
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            self.frames = 0
+            self.bus_time = 0.0
+            self.throttled = 0.0
+            self._started = time.monotonic()
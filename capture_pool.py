@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Process-pool capture
+Spreads many ports over worker processes, each running its own
+DeviceManager loop, decoders and capture writers, so decoding and disk
+output scale with CPU cores instead of sharing one interpreter. Workers
+send the parent only periodic statistics and the frames matching a
+selection filter.
+"""
+
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from can_capture import CaptureWriter
+from can_filter import FrameFilter
+from can_frame import RECORD, CanFrame
+from device_manager import DeviceManager
+from event_log import logger, frame_logger, stats_logger, configure_logging
+from frame_bus import FrameBus
+from waveshare_can_tool import DeviceConfig
+
+
+# How often workers hand selected frames to the parent
+SELECTED_FLUSH_INTERVAL = 0.05
+# Selected record bytes a worker buffers between flushes before dropping
+MAX_SELECTED_BYTES = 1 << 20
+
+_COUNTERS = ('frames', 'bytes', 'filtered', 'decode_errors', 'overflows', 'errors',
+             'rx_frames_per_s', 'captured', 'capture_dropped')
+
+
+def capture_path(output_dir: str, port: str) -> str:
+    """Capture file for a port, e.g. /dev/ttyUSB0 -> <output_dir>/ttyUSB0.cap"""
+    name = os.path.basename(port.rstrip('/\\')) or 'port'
+    return os.path.join(output_dir, name.replace(':', '_') + '.cap')
+
+
+def _worker_stats(manager: DeviceManager, writers: Dict[str, CaptureWriter]) -> Dict[str, Any]:
+    devices = manager.stats()['devices']
+    for device_id, stats in devices.items():
+        writer = writers.get(device_id)
+        stats['captured'] = writer.frames_written if writer else 0
+        stats['capture_dropped'] = writer.dropped if writer else 0
+    return devices
+
+
+def _capture_worker(index: int, devices: List[Tuple[int, str, str, Optional[str]]], config,
+                    select: Optional[List], stats_interval: float, log_level: int,
+                    messages, stop_event):
+    """Worker process: one selector loop over this worker's ports"""
+    # Ctrl-C reaches the whole process group; the parent decides when to stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    configure_logging(log_level, quiet=True)
+
+    selector = FrameFilter(select) if select else None
+    writers: Dict[str, CaptureWriter] = {}
+    pending = bytearray()
+    selected_dropped = 0
+    lock = threading.Lock()
+
+    def on_records(device, records):
+        nonlocal selected_dropped
+        writer = writers.get(device.device_id)
+        if writer:
+            writer.write_records(records)
+        if selector:
+            chosen = selector.filter_records(records)
+            if chosen:
+                with lock:
+                    if len(pending) + len(chosen) <= MAX_SELECTED_BYTES:
+                        pending.extend(chosen)
+                    else:
+                        selected_dropped += len(chosen) // RECORD.size
+
+    def flush_selected():
+        with lock:
+            if not pending:
+                return
+            records = bytes(pending)
+            pending.clear()
+        messages.put(('frames', index, records))
+
+    manager = DeviceManager(on_records=on_records)
+    failed = []
+    for channel, port, device_id, path in devices:
+        if not manager.add(port, device_id, config=config, channel=channel):
+            failed.append(device_id)
+            continue
+        if path:
+            writer = CaptureWriter(path, config)
+            writer.start()
+            writers[device_id] = writer
+    messages.put(('ready', index, failed))
+
+    manager.start()
+    next_stats = time.monotonic() + stats_interval
+    try:
+        while not stop_event.wait(SELECTED_FLUSH_INTERVAL):
+            flush_selected()
+            if time.monotonic() >= next_stats:
+                next_stats += stats_interval
+                messages.put(('stats', index, (_worker_stats(manager, writers), selected_dropped)))
+    finally:
+        manager.stop()
+        for writer in writers.values():
+            writer.close()
+        flush_selected()
+        messages.put(('done', index, (_worker_stats(manager, writers), selected_dropped)))
+        manager.close()
+
+
+class CapturePool:
+    """Captures many ports with one worker process per group of ports
+
+    Each port gets a capture file in output_dir (if given) and a channel
+    number (its position in ports + 1) carried by every frame it
+    produces. Frames accepted by `select` (FrameFilter whitelist entries)
+    are shipped to the parent and published on `bus`; everything else
+    stays in the workers.
+    """
+
+    def __init__(self, ports: Iterable[str], output_dir: Optional[str] = None,
+                 config: Optional[DeviceConfig] = None, processes: Optional[int] = None,
+                 select: Optional[Iterable] = None, stats_interval: float = 1.0,
+                 bus: Optional[FrameBus] = None):
+        self.ports = list(ports)
+        if not self.ports:
+            raise ValueError("No ports given")
+        self.output_dir = output_dir
+        self.config = config or DeviceConfig()
+        self.processes = max(1, min(processes or os.cpu_count() or 1, len(self.ports)))
+        self.select = list(select) if select else None
+        self.stats_interval = stats_interval
+        self.bus = bus if bus is not None else FrameBus()
+
+        self.failed: List[str] = []
+        self.selected_frames = 0
+        self._device_stats: Dict[str, Dict[str, Any]] = {}
+        self._selected_dropped: Dict[int, int] = {}
+        self._workers: List[Any] = []
+        self._done = set()
+        self._ready = threading.Event()
+        self._ready_count = 0
+        self._lock = threading.Lock()
+        self._collector: Optional[threading.Thread] = None
+        self._messages = None
+        self._stop_event = None
+
+    def channel_port(self, channel: int) -> Optional[str]:
+        """The port a frame's channel refers to"""
+        return self.ports[channel - 1] if 0 < channel <= len(self.ports) else None
+
+    def start(self, timeout: float = 10.0) -> bool:
+        """Start the workers; True once every worker has opened its ports"""
+        if self._workers:
+            return True
+        if self.output_dir:
+            os.makedirs(self.output_dir, exist_ok=True)
+
+        context = multiprocessing.get_context()
+        self._messages = context.Queue()
+        self._stop_event = context.Event()
+        self._done.clear()
+        self._ready.clear()
+        self._ready_count = 0
+
+        groups = [[] for _ in range(self.processes)]
+        for index, port in enumerate(self.ports):
+            path = capture_path(self.output_dir, port) if self.output_dir else None
+            groups[index % self.processes].append((index + 1, port, port, path))
+        for index, devices in enumerate(groups):
+            worker = context.Process(
+                target=_capture_worker, name=f"capture-{index}",
+                args=(index, devices, self.config, self.select, self.stats_interval,
+                      logger.getEffectiveLevel(), self._messages, self._stop_event))
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+
+        self._collector = threading.Thread(target=self._collect)
+        self._collector.daemon = True
+        self._collector.start()
+
+        if not self._ready.wait(timeout):
+            logger.error("✗ Capture workers did not start in %ss", timeout)
+            return False
+        opened = len(self.ports) - len(self.failed)
+        logger.info("✓ Capturing %s/%s ports in %s processes", opened, len(self.ports), self.processes)
+        return opened > 0
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the workers and wait for their final statistics"""
+        if not self._workers:
+            return
+        self._stop_event.set()
+        deadline = time.monotonic() + timeout
+        for worker in self._workers:
+            worker.join(max(0.0, deadline - time.monotonic()))
+        for worker in self._workers:
+            if worker.is_alive():
+                logger.warning("⚠ %s did not stop, terminating", worker.name)
+                worker.terminate()
+        if self._collector:
+            self._collector.join(max(0.1, deadline - time.monotonic()))
+            self._collector = None
+        self._workers = []
+
+    @property
+    def running(self) -> bool:
+        return any(worker.is_alive() for worker in self._workers)
+
+    def stats(self) -> Dict[str, Any]:
+        """Latest per-port figures reported by the workers, and their totals"""
+        with self._lock:
+            devices = {device_id: dict(stats) for device_id, stats in self._device_stats.items()}
+            selected_dropped = sum(self._selected_dropped.values())
+        total = {key: sum(stats.get(key, 0) for stats in devices.values()) for key in _COUNTERS}
+        total['devices'] = len(self.ports)
+        total['connected'] = sum(1 for stats in devices.values() if stats['connected'])
+        total['workers'] = sum(1 for worker in self._workers if worker.is_alive())
+        total['selected'] = self.selected_frames
+        total['selected_dropped'] = selected_dropped
+        return {'devices': devices, 'total': total, 'failed': list(self.failed)}
+
+    def summary(self) -> str:
+        total = self.stats()['total']
+        return (f"{total['connected']}/{total['devices']} ports, {total['workers']} workers | "
+                f"RX {total['rx_frames_per_s']:.0f} fr/s | {total['frames']} frames, "
+                f"{total['captured']} captured, {total['capture_dropped']} dropped")
+
+    def _collect(self):
+        """Parent thread: apply worker messages until every worker is done"""
+        while len(self._done) < len(self._workers):
+            try:
+                kind, index, payload = self._messages.get(timeout=0.2)
+            except queue.Empty:
+                if not self.running:
+                    break
+                continue
+            if kind == 'frames':
+                frames = [CanFrame.from_record(record) for record in RECORD.iter_unpack(payload)]
+                self.selected_frames += len(frames)
+                self.bus.publish(frames)
+            elif kind in ('stats', 'done'):
+                devices, selected_dropped = payload
+                with self._lock:
+                    self._device_stats.update(devices)
+                    self._selected_dropped[index] = selected_dropped
+                if kind == 'done':
+                    self._done.add(index)
+            elif kind == 'ready':
+                self.failed.extend(payload)
+                self._ready_count += 1
+                if self._ready_count == len(self._workers):
+                    self._ready.set()
+
+
+def main():
+    """Capture several converters in parallel processes"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Waveshare CAN Tool - multi-port capture")
+    parser.add_argument('--ports', nargs='+', required=True, help='Serial ports')
+    parser.add_argument('--output-dir', default='captures', help='Directory for the capture files')
+    parser.add_argument('--processes', type=int, help='Worker processes (default: one per core)')
+    parser.add_argument('--select', nargs='+', metavar='ID',
+                        help='Send these IDs to this process for display (0x123, 0x100-0x1FF, id/mask)')
+    parser.add_argument('--duration', type=float, default=10.0, help='Capture time in seconds')
+    args = parser.parse_args()
+    configure_logging(quiet=not args.select)
+
+    pool = CapturePool(args.ports, args.output_dir, processes=args.processes, select=args.select)
+    subscription = pool.bus.subscribe('cli') if args.select else None
+    if not pool.start():
+        pool.stop()
+        return 1
+
+    deadline = time.monotonic() + args.duration
+    try:
+        while time.monotonic() < deadline:
+            if subscription:
+                for frame in subscription.get_many(1000, timeout=1.0):
+                    port = pool.channel_port(frame.channel)
+                    frame_logger.info("[%s] RX: ID=%s, Data=%s", port, frame.id_text, frame.data.hex())
+            else:
+                time.sleep(1.0)
+                stats_logger.info("%s", pool.summary())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.stop()
+        for device_id, stats in pool.stats()['devices'].items():
+            logger.info("  %s: %s frames, %s captured, %s dropped, %s bytes discarded",
+                        device_id, stats['frames'], stats['captured'],
+                        stats['capture_dropped'], stats['decode_errors'])
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
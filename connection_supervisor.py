@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Connection supervisor
+Reopens a converter that dropped off (USB reset, cable glitch, unplug)
+with exponential backoff, re-applies the configuration it had and
+reports the interval during which nothing could be received
+"""
+
+import os
+import time
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from event_log import logger
+
+
+class ReconnectPolicy:
+    """Backoff schedule for reconnect attempts
+
+    Attempts start initial_delay after the failure and the delay doubles
+    up to max_delay, so a quick USB re-enumeration is picked up within
+    tens of milliseconds. max_retries further attempts are made at
+    max_delay before giving up (0 = never give up).
+    """
+
+    def __init__(self, enabled: bool = True, max_retries: int = 3, initial_delay: float = 0.05,
+                 max_delay: float = 1.0, factor: float = 2.0):
+        if initial_delay <= 0 or max_delay < initial_delay or factor < 1:
+            raise ValueError("invalid reconnect backoff")
+        self.enabled = enabled
+        self.max_retries = max_retries
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.factor = factor
+
+    @classmethod
+    def from_config(cls, error_handling: Dict[str, Any]) -> 'ReconnectPolicy':
+        """Build from a windows_config.json 'error_handling' section"""
+        max_delay = error_handling.get('retry_delay_ms', 1000) / 1000.0
+        return cls(enabled=error_handling.get('retry_on_error', True),
+                   max_retries=error_handling.get('max_retries', 3),
+                   initial_delay=min(0.05, max_delay), max_delay=max_delay)
+
+    def delays(self) -> Iterator[float]:
+        delay = self.initial_delay
+        while delay < self.max_delay:
+            yield delay
+            delay *= self.factor
+        retries = 0
+        while not self.max_retries or retries < self.max_retries:
+            yield self.max_delay
+            retries += 1
+
+
+class ConnectionSupervisor:
+    """Brings a WaveshareCANTool back after its port fails
+
+    Used by the monitor thread, which is the only reader of the port, so
+    the reopen and the configuration commands never race with frame
+    reception.
+    """
+
+    def __init__(self, tool, policy: Optional[ReconnectPolicy] = None):
+        self.tool = tool
+        self.policy = policy or ReconnectPolicy()
+
+        self.outages = 0
+        self.reconnects = 0
+        self.attempts = 0
+        self.downtime = 0.0  # seconds without a working port
+        self.last_gap: Optional[Tuple[int, int]] = None
+
+    def _port_missing(self) -> bool:
+        """Cheap check that skips opening a device node that is not back yet"""
+        port = self.tool.port
+        return port.startswith('/dev/') and not os.path.exists(port)
+
+    def recover(self, error: Exception,
+                keep_trying: Callable[[], bool] = lambda: True) -> Optional[Tuple[int, int]]:
+        """Reopen the port after error
+
+        Returns (lost_ns, resumed_ns) on the monotonic clock, or None when
+        the policy is disabled, exhausted or keep_trying() turns false.
+        """
+        if not self.policy.enabled:
+            return None
+        tool = self.tool
+        lost_ns = time.monotonic_ns()
+        self.outages += 1
+        # Re-apply only a configuration the device had actually confirmed
+        reapply = tool.device_shadow is not None
+        logger.warning("⚠ Connection to %s lost: %s", tool.port, error)
+        try:
+            if tool.serial_conn:
+                tool.serial_conn.close()
+        except Exception:
+            pass
+
+        attempt = 0
+        for delay in self.policy.delays():
+            time.sleep(delay)
+            if not keep_trying():
+                return None
+            attempt += 1
+            self.attempts += 1
+            if self._port_missing() or not tool.connect():
+                continue
+
+            if reapply and not tool.apply_config(force=True, save=False):
+                logger.warning("⚠ Configuration could not be re-applied after reconnect")
+            resumed_ns = time.monotonic_ns()
+            self.reconnects += 1
+            self.downtime += (resumed_ns - lost_ns) / 1e9
+            self.last_gap = (lost_ns, resumed_ns)
+            logger.info("✓ Reconnected to %s after %.0f ms (attempt %s)",
+                        tool.port, (resumed_ns - lost_ns) / 1e6, attempt)
+            return self.last_gap
+
+        self.downtime += (time.monotonic_ns() - lost_ns) / 1e9
+        logger.error("✗ Giving up on %s after %s reconnect attempts", tool.port, attempt)
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'outages': self.outages,
+            'reconnects': self.reconnects,
+            'attempts': self.attempts,
+            'downtime_s': self.downtime,
+            'last_gap_ms': (self.last_gap[1] - self.last_gap[0]) / 1e6 if self.last_gap else None,
+        }
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Device identity cache
+Remembers what a converter answered to the identification commands
+(AT+VER, AT+INFO, AT+STATUS, AT) per adapter, in memory and on disk with
+a time-to-live, so the slow probe runs once per device instead of on
+every call
+"""
+
+import os
+from typing import Any, Dict, Optional
+
+import serial.tools.list_ports
+
+from json_cache import JsonCache
+
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.waveshare_can', 'device_info.json')
+DEFAULT_TTL = 24 * 3600.0
+
+
+def port_key(info) -> str:
+    """Stable identity of a serial adapter across re-enumeration
+
+    The USB serial number when the adapter has one, otherwise VID:PID plus
+    the USB location (identical adapters differ only by where they are
+    plugged in), otherwise the device path.
+    """
+    serial_number = getattr(info, 'serial_number', None)
+    vid, pid = getattr(info, 'vid', None), getattr(info, 'pid', None)
+    if serial_number:
+        return f"SN:{serial_number}"
+    if vid is not None and pid is not None:
+        return f"USB:{vid:04X}:{pid:04X}@{getattr(info, 'location', None) or info.device}"
+    return getattr(info, 'device', info)
+
+
+def port_identity(port: str) -> str:
+    """port_key() of the adapter currently on port (the path if not listed)"""
+    for info in serial.tools.list_ports.comports():
+        if info.device == port:
+            return port_key(info)
+    return port
+
+
+class DeviceInfoCache(JsonCache):
+    """Identification responses per adapter key, expiring after ttl seconds
+
+    Entries are {'info', 'firmware', 'probed'}.
+    """
+
+    name = 'device info cache'
+    stamp = 'probed'
+
+    def __init__(self, path: Optional[str] = DEFAULT_CACHE_PATH, ttl: float = DEFAULT_TTL):
+        super().__init__(path, ttl)
+
+    def put(self, key: str, info: Dict[str, Any]):
+        self.set(key, {'info': info, 'firmware': info.get('AT+VER')})
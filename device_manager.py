@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Multi-device manager
+Opens several converters and serves all of them from one selectors-based
+I/O thread: received bytes are decoded per device, tagged with the
+device's channel number and published on a shared FrameBus
+"""
+
+import os
+import selectors
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from bus_load import BusLoadEstimator
+from can_codec import FrameDecoder
+from can_frame import RECORD, CanFrame
+from event_log import logger, configure_logging
+from frame_bus import FrameBus
+from waveshare_can_tool import WaveshareCANTool, DeviceConfig
+
+
+class ManagedDevice:
+    """One converter registered with a DeviceManager"""
+
+    def __init__(self, device_id: str, channel: int, tool: WaveshareCANTool):
+        self.device_id = device_id
+        self.channel = channel
+        self.tool = tool
+        self.decoder = FrameDecoder(tool.config.work_mode)
+        self.decoder.channel = channel
+        self.fd: Optional[int] = None
+
+        self.frames = 0
+        self.bytes = 0
+        self.filtered = 0
+        self.errors = 0
+        self.last_rx_ns = 0
+
+    @property
+    def bus_load(self) -> BusLoadEstimator:
+        return self.tool.bus_load
+
+    def stats(self) -> Dict[str, Any]:
+        load = self.bus_load.window(1)
+        return {
+            'port': self.tool.port,
+            'channel': self.channel,
+            'connected': self.fd is not None,
+            'frames': self.frames,
+            'bytes': self.bytes,
+            'filtered': self.filtered,
+            'decode_errors': self.decoder.bytes_discarded,
+            'overflows': self.decoder.ring.overflows,
+            'errors': self.errors,
+            'rx_frames_per_s': load['rx']['frames_per_s'],
+            'bus_load': load['bus_load'],
+        }
+
+
+class DeviceManager:
+    """Serves many converters from a single I/O thread
+
+    Devices are configured through their own WaveshareCANTool (connect,
+    apply_config, ...) before start(); while the loop runs it is the only
+    reader of every port. Frames reach subscribers of `bus` with
+    frame.channel identifying the device (see channels / device()).
+    on_records, if set, is called from the I/O thread with each device's
+    filtered packed records (valid only during the call).
+    """
+
+    def __init__(self, bus: Optional[FrameBus] = None, read_timeout: float = 0.2,
+                 on_records: Optional[Callable[['ManagedDevice', Any], None]] = None):
+        self.bus = bus if bus is not None else FrameBus()
+        self.read_timeout = read_timeout
+        self.on_records = on_records
+        self.devices: Dict[str, ManagedDevice] = {}
+        self.channels: Dict[int, ManagedDevice] = {}
+
+        self._selector = selectors.DefaultSelector()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    def add(self, port: str, device_id: Optional[str] = None,
+            config: Optional[DeviceConfig] = None, apply: bool = False,
+            channel: Optional[int] = None) -> Optional[ManagedDevice]:
+        """Open a port and register it with the loop; None if it cannot be opened"""
+        device_id = device_id or port
+        if device_id in self.devices:
+            raise ValueError(f"Device already registered: {device_id}")
+        if channel is not None and (channel in self.channels or not 0 < channel <= 0xFFFF):
+            raise ValueError(f"Channel unavailable: {channel}")
+
+        tool = WaveshareCANTool(port)
+        if config is not None:
+            tool.config = config
+            tool.bus_load.config = config
+            if tool.tx_limiter:
+                tool.tx_limiter.config = config
+        if not tool.connect():
+            return None
+        if apply and not tool.apply_config():
+            tool.disconnect()
+            return None
+
+        try:
+            fd = tool.serial_conn.fileno()
+        except (AttributeError, OSError, ValueError):
+            logger.error("✗ %s: port cannot be watched by a selector (POSIX only)", port)
+            tool.disconnect()
+            return None
+
+        with self._lock:
+            if channel is None:
+                channel = max(self.channels, default=0) + 1
+            device = ManagedDevice(device_id, channel, tool)
+            device.fd = fd
+            self.devices[device_id] = device
+            self.channels[channel] = device
+            self._selector.register(fd, selectors.EVENT_READ, device)
+        logger.info("✓ %s registered as channel %s", device_id, channel)
+        return device
+
+    def remove(self, device_id: str):
+        """Unregister and close one device"""
+        with self._lock:
+            device = self.devices.pop(device_id, None)
+            if device is None:
+                return
+            self.channels.pop(device.channel, None)
+            self._unregister(device)
+        device.tool.disconnect()
+
+    def device(self, channel: int) -> Optional[ManagedDevice]:
+        """The device a frame's channel refers to"""
+        return self.channels.get(channel)
+
+    def send(self, device_id: str, can_id: int, data: bytes, extended: bool = False) -> bool:
+        """Transmit on one device (writes do not go through the loop)"""
+        device = self.devices.get(device_id)
+        return bool(device and device.tool.send_can_frame(can_id, data, extended))
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._loop)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def close(self):
+        """Stop the loop and close every device"""
+        self.stop()
+        for device_id in list(self.devices):
+            self.remove(device_id)
+        self._selector.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-device figures plus totals over all devices"""
+        devices = {device_id: device.stats() for device_id, device in list(self.devices.items())}
+        total = {key: sum(stats[key] for stats in devices.values())
+                 for key in ('frames', 'bytes', 'filtered', 'decode_errors', 'overflows',
+                             'errors', 'rx_frames_per_s')}
+        total['devices'] = len(devices)
+        total['connected'] = sum(1 for stats in devices.values() if stats['connected'])
+        return {'devices': devices, 'total': total, 'subscribers': self.bus.stats()}
+
+    def _unregister(self, device: ManagedDevice):
+        if device.fd is not None:
+            try:
+                self._selector.unregister(device.fd)
+            except (KeyError, ValueError):
+                pass
+            device.fd = None
+
+    def _loop(self):
+        """The I/O thread: wait on all ports at once, read whatever is ready"""
+        while self._running:
+            if not self._selector.get_map():
+                time.sleep(self.read_timeout)
+                continue
+            try:
+                events = self._selector.select(self.read_timeout)
+            except (OSError, ValueError):
+                # A port was closed under us; the next pass sees the new map
+                continue
+            received_ns = time.monotonic_ns()
+            for key, _ in events:
+                device = key.data
+                try:
+                    self._read(device, received_ns)
+                except Exception as e:
+                    # One failing device or consumer must not stop the others
+                    device.errors += 1
+                    logger.error("✗ %s: %s", device.device_id, e)
+
+    def _read(self, device: ManagedDevice, received_ns: int):
+        ring = device.decoder.ring
+        with self._lock:
+            if device.fd is None:
+                # Removed by another thread since select() returned
+                return
+            try:
+                count = os.readv(device.fd, [ring.writable()])
+            except BlockingIOError:
+                return
+            except OSError as e:
+                count = 0
+                logger.error("✗ %s: %s", device.device_id, e)
+        if not count:
+            # Readable but no data: the device is gone
+            device.errors += 1
+            logger.error("✗ %s: device disconnected", device.device_id)
+            with self._lock:
+                self._unregister(device)
+            return
+
+        ring.commit(count)
+        records = device.decoder.decode_records(received_ns)
+        tool = device.tool
+        tool.bus_load.add_records('rx', records, count)
+        frame_count = len(records) // RECORD.size
+        if frame_count and tool.frame_filter:
+            records = tool.frame_filter.filter_records(records)
+            device.filtered += frame_count - len(records) // RECORD.size
+            frame_count = len(records) // RECORD.size
+
+        device.bytes += count
+        device.frames += frame_count
+        device.last_rx_ns = received_ns
+        if frame_count and self.on_records:
+            self.on_records(device, records)
+        if frame_count and self.bus.has_subscribers:
+            self.bus.publish([CanFrame.from_record(record) for record in RECORD.iter_unpack(records)])
+
+
+def main():
+    """Monitor several converters at once"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Waveshare CAN Tool - multi-device monitor")
+    parser.add_argument('--ports', nargs='+', required=True, help='Serial ports')
+    parser.add_argument('--duration', type=float, default=10.0, help='Monitoring time in seconds')
+    parser.add_argument('--show-frames', action='store_true', help='Print every received frame')
+    args = parser.parse_args()
+    configure_logging()
+
+    manager = DeviceManager()
+    for port in args.ports:
+        manager.add(port)
+    if not manager.devices:
+        return 1
+
+    subscription = manager.bus.subscribe('cli') if args.show_frames else None
+    manager.start()
+    deadline = time.monotonic() + args.duration
+    try:
+        while time.monotonic() < deadline:
+            if subscription:
+                for frame in subscription.get_many(1000, timeout=1.0):
+                    device = manager.device(frame.channel)
+                    print(f"[{device.device_id if device else frame.channel}] "
+                          f"RX: ID={frame.id_text}, Data={frame.data.hex()}")
+            else:
+                time.sleep(1.0)
+                total = manager.stats()['total']
+                print(f"{total['connected']}/{total['devices']} devices, "
+                      f"{total['rx_frames_per_s']:.0f} frames/s, {total['frames']} frames")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for device_id, stats in manager.stats()['devices'].items():
+            print(f"  {device_id}: {stats['frames']} frames, {stats['bytes']} bytes, "
+                  f"{stats['decode_errors']} bytes discarded, {stats['errors']} errors")
+        manager.close()
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
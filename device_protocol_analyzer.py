@@ -9,6 +9,9 @@ import time
 import threading
 from datetime import datetime
 
+from serial_reader import SerialReader
+from baud_detect import PassiveBaudDetector
+
 
 class ProtocolAnalyzer:
     def __init__(self, port='/dev/tty.usbserial-1140'):
@@ -81,18 +84,38 @@ class ProtocolAnalyzer:
         
         return None
     
+    def detect_baud_passive(self):
+        """Infer the baud rate from live traffic without transmitting"""
+        if not self.serial_conn or not self.serial_conn.is_open:
+            return None
+        
+        detector = PassiveBaudDetector(self.serial_conn)
+        start = time.monotonic()
+        best = detector.detect()
+        elapsed = (time.monotonic() - start) * 1000
+        
+        for score in detector.scores:
+            print(f"  {score.baud:>6}: score={score.score:.2f} bytes={score.nbytes} "
+                  f"errors={score.error_rate:.0%} structure={score.structure:.0%} ({score.mode or '-'})")
+        if best:
+            print(f"  *** Likely baud rate: {best.baud} ({elapsed:.0f} ms, listening only) ***")
+            return best.baud
+        print(f"  No traffic to infer the baud rate from ({elapsed:.0f} ms)")
+        return None
+    
     def sniff_traffic(self, duration=30):
         """Sniff traffic for a specified duration"""
         if not self.serial_conn or not self.serial_conn.is_open:
             return
         
         print(f"Sniffing traffic for {duration} seconds...")
-        start_time = time.time()
+        reader = SerialReader(self.serial_conn)
+        deadline = time.monotonic() + duration
         
-        while time.time() - start_time < duration:
+        while time.monotonic() < deadline:
             try:
-                if self.serial_conn.in_waiting > 0:
-                    data = self.serial_conn.read(self.serial_conn.in_waiting)
+                data = reader.read_until_deadline(deadline)
+                if data:
                     timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
                     
                     # Display both hex and ASCII
@@ -104,8 +127,7 @@ class ProtocolAnalyzer:
                     print("-" * 50)
             except Exception as e:
                 print(f"Error reading data: {e}")
-            
-            time.sleep(0.1)
+                break
     
     def send_raw_data(self, data):
         """Send raw data to device"""
@@ -175,9 +197,12 @@ class ProtocolAnalyzer:
             return
         
         try:
-            # Test 1: Try different baud rates
-            print("\n1. Testing baud rates...")
-            working_baud = self.test_baud_rates()
+            # Test 1: Infer the baud rate from live traffic, probe only if silent
+            print("\n1. Detecting baud rate from traffic...")
+            working_baud = self.detect_baud_passive()
+            if not working_baud:
+                print("Testing baud rates...")
+                working_baud = self.test_baud_rates()
             
             if working_baud:
                 print(f"Found working baud rate: {working_baud}")
@@ -269,6 +294,8 @@ def main():
     parser.add_argument('--analyze', action='store_true', help='Run full analysis')
     parser.add_argument('--interactive', action='store_true', help='Interactive mode')
     parser.add_argument('--baud-test', action='store_true', help='Test baud rates only')
+    parser.add_argument('--passive-baud', action='store_true',
+                        help='Infer the baud rate from traffic without sending anything')
     
     args = parser.parse_args()
     
@@ -281,8 +308,12 @@ def main():
     elif args.baud_test:
         analyzer.connect()
         analyzer.test_baud_rates()
+    elif args.passive_baud:
+        if analyzer.connect():
+            analyzer.detect_baud_passive()
+            analyzer.serial_conn.close()
     else:
-        print("Use --analyze, --interactive, or --baud-test")
+        print("Use --analyze, --interactive, --baud-test or --passive-baud")
 
 
 if __name__ == "__main__":
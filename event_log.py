@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Event logging for the Waveshare CAN tools
+Level-gated loggers with lazy formatting, plus periodic throughput
+summaries for quiet high-rate operation
+
+Loggers:
+  waveshare_can         connection, configuration and error events
+  waveshare_can.frames  one record per transmitted / received frame
+  waveshare_can.stats   periodic frames/s, bytes/s and error summaries
+"""
+
+import logging
+import sys
+import time
+from typing import Optional
+
+
+logger = logging.getLogger('waveshare_can')
+frame_logger = logging.getLogger('waveshare_can.frames')
+stats_logger = logging.getLogger('waveshare_can.stats')
+
+
+def configure_logging(level: int = logging.INFO, quiet: bool = False, stream=None):
+    """Route tool events to the console the way the scripts always printed them
+
+    quiet=True disables the per-frame records so that only events and
+    periodic summaries reach the terminal.
+    """
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+
+    logger.handlers[:] = [handler]
+    logger.setLevel(level)
+    logger.propagate = False
+    frame_logger.setLevel(logging.WARNING if quiet else logging.NOTSET)
+
+
+class RateSummary:
+    """Accumulates traffic counters and logs a summary every interval"""
+
+    def __init__(self, label: str, interval: float = 1.0):
+        self.label = label
+        self.interval = interval
+        self.frames = 0
+        self.bytes = 0
+        self.errors = 0
+        self._window_start = time.monotonic()
+
+    def add(self, frames: int, nbytes: int, errors: int = 0):
+        self.frames += frames
+        self.bytes += nbytes
+        self.errors += errors
+
+    def add_batch(self, batch, errors: int = 0):
+        """Count a FrameBatch without touching individual frames"""
+        self.add(len(batch), batch.nbytes, errors)
+
+    def maybe_report(self, interval: Optional[float] = None, now: Optional[float] = None) -> bool:
+        """Log and reset the counters once the interval has elapsed"""
+        now = time.monotonic() if now is None else now
+        elapsed = now - self._window_start
+        if elapsed < (interval or self.interval):
+            return False
+
+        if stats_logger.isEnabledFor(logging.INFO):
+            stats_logger.info("%s: %.0f frames/s, %.0f bytes/s, %d errors",
+                              self.label, self.frames / elapsed, self.bytes / elapsed, self.errors)
+        self.frames = self.bytes = self.errors = 0
+        self._window_start = now
+        return True
@@ -7,8 +7,11 @@ Professional device configuration and testing by an expert
 import sys
 import time
 import json
+import logging
 from datetime import datetime
 from waveshare_can_tool import WaveshareCANTool, WorkMode, FrameType
+from event_log import logger, configure_logging
+from port_discovery import PortDiscovery
 import serial.tools.list_ports
 
 class ExpertConfigurator:
@@ -28,7 +31,9 @@ class ExpertConfigurator:
             'details': details
         }
         self.configuration_log.append(entry)
-        print(f"[{datetime.now().strftime('%H:%M:%S')}] {action}: {'✓' if result else '✗'} {details}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("[%s] %s: %s %s", datetime.now().strftime('%H:%M:%S'),
+                        action, '✓' if result else '✗', details)
     
     def detect_device(self):
         """Expert device detection"""
@@ -43,9 +48,12 @@ class ExpertConfigurator:
             if 'usbserial' in port.device or 'USB' in port.description:
                 print(f"    → Likely CAN device: {port.device}")
         
-        # Test connection to primary port
-        primary_port = '/dev/tty.usbserial-1140'
+        # Probe every port at once; fall back to the usual adapter path
+        found = PortDiscovery().discover()
+        primary_port = found[0].port if found else '/dev/tty.usbserial-1140'
         self.tool.port = primary_port
+        if found:
+            self.tool.baudrate = found[0].baud
         
         if self.tool.connect():
             self.log_action("Device Detection", True, f"Connected to {primary_port}")
@@ -395,6 +403,7 @@ class ExpertConfigurator:
 
 def main():
     """Main function"""
+    configure_logging()
     configurator = ExpertConfigurator()
     success = configurator.run_expert_configuration()
     return 0 if success else 1
@@ -11,6 +11,7 @@ import os
 import platform
 from datetime import datetime
 from waveshare_can_tool import WaveshareCANTool, WorkMode, FrameType
+from event_log import configure_logging
 import serial.tools.list_ports
 
 class WindowsExpertConfigurator:
@@ -566,6 +567,7 @@ try {{
 
 def main():
     """Main function"""
+    configure_logging()
     # Install colorama for Windows color support
     try:
         import colorama
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+In-process frame bus
+One serial reader publishes received frames; every consumer (display,
+logger, statistics, web clients) subscribes with its own bounded queue
+and overflow policy, so a slow consumer only ever loses its own frames
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence
+
+
+# windows_config.json: performance_settings.buffer_management.overflow_handling
+OVERFLOW_POLICIES = ('drop_oldest', 'drop_newest', 'block')
+
+
+class Subscription:
+    """Bounded frame queue for one consumer
+
+    When full, 'drop_oldest' discards the oldest queued frames,
+    'drop_newest' discards the incoming ones and 'block' makes the
+    publisher wait up to block_timeout for room before dropping.
+    """
+
+    def __init__(self, name: str, maxsize: int = 8192, policy: str = 'drop_oldest',
+                 block_timeout: float = 1.0):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"policy must be one of {OVERFLOW_POLICIES}")
+        self.name = name
+        self.maxsize = maxsize
+        self.policy = policy
+        self.block_timeout = block_timeout
+
+        self.delivered = 0
+        self.dropped = 0
+        self.closed = False
+
+        self._queue: deque = deque(maxlen=maxsize if policy == 'drop_oldest' else None)
+        self._cond = threading.Condition()
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def put(self, frames: Sequence):
+        """Queue frames according to the overflow policy (publisher side)"""
+        with self._cond:
+            if self.closed:
+                return
+            queue = self._queue
+            if self.policy == 'drop_oldest':
+                # deque(maxlen) evicts from the left by itself
+                overflow = len(queue) + len(frames) - self.maxsize
+                if overflow > 0:
+                    self.dropped += overflow
+                queue.extend(frames)
+            elif self.policy == 'drop_newest':
+                room = self.maxsize - len(queue)
+                if room < len(frames):
+                    self.dropped += len(frames) - max(room, 0)
+                    frames = frames[:max(room, 0)]
+                queue.extend(frames)
+            else:
+                deadline = time.monotonic() + self.block_timeout
+                offset = 0
+                while offset < len(frames):
+                    room = self.maxsize - len(queue)
+                    if room <= 0:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0 or self.closed:
+                            self.dropped += len(frames) - offset
+                            break
+                        self._cond.wait(remaining)
+                        continue
+                    queue.extend(frames[offset:offset + room])
+                    offset += room
+                    self._cond.notify_all()
+            self._cond.notify_all()
+
+    def get_many(self, max_items: int = 1000, timeout: Optional[float] = 0.0) -> List:
+        """Take up to max_items frames, waiting up to timeout for the first"""
+        with self._cond:
+            if not self._queue and timeout != 0 and not self.closed:
+                self._cond.wait_for(lambda: self._queue or self.closed, timeout)
+            queue = self._queue
+            count = min(max_items, len(queue))
+            frames = [queue.popleft() for _ in range(count)]
+            self.delivered += count
+            if count and self.policy == 'block':
+                self._cond.notify_all()
+            return frames
+
+    def get(self, timeout: Optional[float] = None):
+        """Take one frame; None on timeout or once closed and empty"""
+        frames = self.get_many(1, timeout)
+        return frames[0] if frames else None
+
+    def close(self):
+        """Wake any waiting consumer or publisher"""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'policy': self.policy,
+            'queued': len(self._queue),
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+        }
+
+
+class FrameBus:
+    """Publish/subscribe fan-out of received frames"""
+
+    def __init__(self, default_size: int = 8192, default_policy: str = 'drop_oldest'):
+        if default_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"policy must be one of {OVERFLOW_POLICIES}")
+        self.default_size = default_size
+        self.default_policy = default_policy
+        self.published = 0
+        self._subscribers: List[Subscription] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, buffer_management: Dict[str, Any]) -> 'FrameBus':
+        """Build from a windows_config.json 'buffer_management' section"""
+        return cls(default_size=buffer_management.get('rx_buffer_size', 8192),
+                   default_policy=buffer_management.get('overflow_handling', 'drop_oldest'))
+
+    def subscribe(self, name: str, maxsize: Optional[int] = None, policy: Optional[str] = None,
+                  block_timeout: float = 1.0) -> Subscription:
+        subscription = Subscription(name, maxsize or self.default_size,
+                                    policy or self.default_policy, block_timeout)
+        with self._lock:
+            # Copy-on-write so publish() can iterate without the lock
+            self._subscribers = self._subscribers + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscription.close()
+        with self._lock:
+            self._subscribers = [s for s in self._subscribers if s is not subscription]
+
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self._subscribers)
+
+    def publish(self, frames: Sequence):
+        """Deliver a batch of frames to every subscriber"""
+        if not frames:
+            return
+        self.published += len(frames)
+        for subscription in self._subscribers:
+            subscription.put(frames)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-subscriber queue depth, delivered and dropped counts"""
+        return {s.name: s.stats() for s in self._subscribers}
+
+    def close(self):
+        with self._lock:
+            subscribers, self._subscribers = self._subscribers, []
+        for subscription in subscribers:
+            subscription.close()
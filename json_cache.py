@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+JSON file cache
+Small per-key store kept in memory and mirrored to a JSON file (written
+atomically), with an optional time-to-live. Shared by the device
+identification and port discovery caches.
+"""
+
+import copy
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from event_log import logger
+
+
+class JsonCache:
+    """Entries per key, stamped when stored and dropped after ttl seconds
+
+    ttl=None keeps entries until invalidated; path=None keeps them in
+    memory only. Subclasses name themselves (for warnings) and choose the
+    timestamp field so existing cache files keep their layout.
+    """
+
+    name = 'cache'
+    stamp = 'updated'
+
+    def __init__(self, path: Optional[str], ttl: Optional[float] = None):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning("⚠ Ignoring unreadable %s %s: %s", self.name, path, e)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Copy of the entry for key, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self.ttl is not None and time.time() - entry.get(self.stamp, 0) > self.ttl:
+                del self._entries[key]
+                self._save()
+                return None
+            return copy.deepcopy(entry)
+
+    def set(self, key: str, entry: Dict[str, Any]):
+        with self._lock:
+            self._entries[key] = dict(copy.deepcopy(entry), **{self.stamp: time.time()})
+            self._save()
+
+    def invalidate(self, key: str):
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._save()
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            temp = f"{self.path}.tmp"
+            with open(temp, 'w') as f:
+                json.dump(self._entries, f, indent=2)
+            os.replace(temp, self.path)
+        except OSError as e:
+            logger.warning("⚠ Could not write %s %s: %s", self.name, self.path, e)
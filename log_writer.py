@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Buffered background log writer
+Receives log records through a bounded queue and writes them to disk in
+large blocks from its own thread, so the serial reader never waits on I/O
+"""
+
+import os
+import queue
+import re
+import threading
+import time
+from typing import Any, Dict, Optional, Union
+
+
+FSYNC_POLICIES = ('never', 'flush', 'block')
+
+_SIZE_UNITS = {'': 1, 'B': 1, 'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3}
+
+
+def parse_size(size: Union[int, str]) -> int:
+    """Convert sizes such as '10MB' (windows_config.json style) to bytes"""
+    if isinstance(size, int):
+        return size
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KMG]?B?)\s*', size.upper())
+    if not match:
+        raise ValueError(f"Invalid size: {size!r}")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2)])
+
+
+class LogWriter:
+    """Writes queued records to a file from a dedicated thread
+
+    write() never blocks: when the queue is full the record is dropped and
+    counted in `dropped`. The thread batches records into blocks of up to
+    block_size bytes, flushes at least every flush_interval seconds and
+    optionally fsyncs ('flush': on every flush, 'block': after every block).
+    With max_file_size set, the file is rotated to path.1 ... path.N, keeping
+    max_files files in total.
+    """
+
+    def __init__(self, path: str, header: Union[str, bytes] = b'',
+                 queue_size: int = 10000, block_size: int = 64 * 1024,
+                 flush_interval: float = 1.0, fsync: str = 'never',
+                 max_file_size: Union[int, str] = 0, max_files: int = 5):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}")
+
+        self.path = path
+        self.header = header.encode('utf-8') if isinstance(header, str) else header
+        self.block_size = block_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.max_file_size = parse_size(max_file_size)
+        self.max_files = max_files
+
+        self.dropped = 0
+        self.bytes_written = 0
+        self.rotations = 0
+
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._file = None
+        self._file_size = 0
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_config(cls, path: str, logging_config: Dict[str, Any], **kwargs) -> 'LogWriter':
+        """Build a writer from a windows_config.json style 'logging' section"""
+        if logging_config.get('file_rotation', False):
+            kwargs.setdefault('max_file_size', logging_config.get('max_file_size', 0))
+            kwargs.setdefault('max_files', logging_config.get('max_files', 5))
+        return cls(path, **kwargs)
+
+    def start(self):
+        """Create the file and start the writer thread"""
+        self._open('wb')
+        self._thread = threading.Thread(target=self._worker)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def write(self, record: Union[str, bytes]) -> bool:
+        """Queue a record for writing; returns False if it had to be dropped"""
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def close(self, timeout: float = 5.0):
+        """Write everything still queued, then close the file"""
+        if self._thread:
+            # The sentinel queues behind all pending records
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                pass
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def _open(self, mode: str):
+        self._file = open(self.path, mode)
+        self._file_size = 0
+        if self.header:
+            self._file.write(self.header)
+            self._file_size = len(self.header)
+
+    def _rotate(self):
+        """Shift path -> path.1 -> ... and start a fresh file"""
+        self._file.close()
+        for index in range(self.max_files - 1, 0, -1):
+            source = self.path if index == 1 else f"{self.path}.{index - 1}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index}")
+        if self.max_files <= 1:
+            os.remove(self.path)
+        self.rotations += 1
+        self._open('wb')
+
+    def _write_block(self, block: bytearray):
+        if self.max_file_size and self._file_size + len(block) > self.max_file_size and self._file_size:
+            self._rotate()
+        self._file.write(block)
+        self._file_size += len(block)
+        self.bytes_written += len(block)
+        if self.fsync == 'block':
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def _flush(self):
+        self._file.flush()
+        if self.fsync == 'flush':
+            os.fsync(self._file.fileno())
+
+    def _worker(self):
+        """Writer thread: gather queued records into blocks"""
+        block = bytearray()
+        next_flush = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                record = self._queue.get(timeout=max(0.0, next_flush - time.monotonic()))
+            except queue.Empty:
+                record = b''
+            if record is None:
+                break
+
+            block += record.encode('utf-8') if isinstance(record, str) else record
+            if len(block) >= self.block_size:
+                self._write_block(block)
+                block.clear()
+
+            if time.monotonic() >= next_flush:
+                if block:
+                    self._write_block(block)
+                    block.clear()
+                self._flush()
+                next_flush = time.monotonic() + self.flush_interval
+
+        if block:
+            self._write_block(block)
+        self._flush()
+        self._file.close()
+        self._file = None
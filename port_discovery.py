@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Port discovery
+Probes every candidate serial port at once for a converter answering AT
+commands, stopping each port's baud sweep at the first valid response,
+and remembers the result per adapter (USB serial number or VID:PID) on
+disk so the next start connects without sweeping
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Iterable, List, NamedTuple, Optional, Sequence
+
+import serial
+import serial.tools.list_ports
+
+from can_codec import WorkMode
+from device_info import port_key, port_identity
+from event_log import logger
+from json_cache import JsonCache
+from serial_reader import SerialReader
+from waveshare_can_tool import response_state
+
+
+# Most common rates first: the sweep stops at the first answer
+BAUD_RATES = (115200, 9600, 57600, 38400, 19200, 230400, 460800, 921600)
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.waveshare_can', 'discovery_cache.json')
+
+
+class DiscoveredDevice(NamedTuple):
+    """A port with a converter answering at baud"""
+    port: str
+    key: str  # adapter identity the cache is keyed by (see port_key)
+    baud: int
+    firmware: Optional[str] = None
+    mode: Optional[str] = None  # WorkMode name, if the device reports it
+    cached: bool = False  # confirmed from the cache without a sweep
+    elapsed: float = 0.0
+
+
+def list_candidates(all_ports: bool = False) -> List[Any]:
+    """Ports worth probing: USB serial adapters unless all_ports"""
+    ports = list(serial.tools.list_ports.comports())
+    if all_ports:
+        return ports
+    return [p for p in ports if p.vid is not None or 'usb' in p.device.lower()]
+
+
+class DiscoveryCache(JsonCache):
+    """JSON file of adapter key -> last known baud, mode and firmware"""
+
+    name = 'discovery cache'
+
+    def __init__(self, path: Optional[str] = DEFAULT_CACHE_PATH):
+        super().__init__(path)
+
+    def put(self, device: DiscoveredDevice):
+        self.set(device.key, {
+            'port': device.port,
+            'baud': device.baud,
+            'firmware': device.firmware,
+            'mode': device.mode,
+        })
+
+    def forget(self, key: str):
+        self.invalidate(key)
+
+
+class PortDiscovery:
+    """Concurrent AT probe of candidate ports with a persistent result cache"""
+
+    def __init__(self, cache: Optional[DiscoveryCache] = None,
+                 baud_rates: Sequence[int] = BAUD_RATES, probe_timeout: float = 0.15,
+                 max_workers: int = 16):
+        self.cache = cache if cache is not None else DiscoveryCache()
+        self.baud_rates = tuple(baud_rates)
+        self.probe_timeout = probe_timeout
+        self.max_workers = max_workers
+
+    def _transact(self, conn: serial.Serial, reader: SerialReader, command: str) -> Optional[str]:
+        """Send one AT command; the response text, or None without an OK/ERROR line"""
+        conn.write(f"{command}\r\n".encode('ascii'))
+        deadline = time.monotonic() + self.probe_timeout
+        response = bytearray()
+        while True:
+            final, _ = response_state(response)
+            if final:
+                return response.decode('utf-8', errors='ignore').strip()
+            chunk = reader.read_until_deadline(deadline)
+            if not chunk:
+                return None
+            response += chunk
+
+    def _identify(self, conn: serial.Serial, reader: SerialReader):
+        """(firmware, mode) from a port already known to answer"""
+        firmware = self._transact(conn, reader, 'AT+VER')
+        if firmware:
+            lines = [line.strip() for line in firmware.splitlines()]
+            firmware = ' '.join(line for line in lines if line and line not in ('OK', 'ERROR')) or None
+        mode = None
+        answer = self._transact(conn, reader, 'AT+WORK?')
+        digits = ''.join(c for c in answer or '' if c.isdigit())
+        if digits:
+            try:
+                mode = WorkMode(int(digits)).name
+            except ValueError:
+                pass
+        return firmware, mode
+
+    def probe(self, port: str, key: Optional[str] = None) -> Optional[DiscoveredDevice]:
+        """Find the baud a converter on port answers at (cached baud first)"""
+        key = key or port
+        start = time.monotonic()
+        cached = self.cache.get(key)
+        bauds = list(self.baud_rates)
+        if cached and cached.get('baud') in bauds:
+            bauds.remove(cached['baud'])
+            bauds.insert(0, cached['baud'])
+        elif cached and cached.get('baud'):
+            bauds.insert(0, cached['baud'])
+
+        try:
+            conn = serial.Serial(port, bauds[0], timeout=0)
+        except (serial.SerialException, OSError) as e:
+            logger.debug("%s: %s", port, e)
+            return None
+        try:
+            reader = SerialReader(conn)
+            for baud in bauds:
+                conn.baudrate = baud
+                conn.reset_input_buffer()
+                if self._transact(conn, reader, 'AT') is None:
+                    continue
+                if cached and baud == cached.get('baud'):
+                    # Same adapter at the same rate: trust the stored details
+                    device = DiscoveredDevice(port, key, baud, cached.get('firmware'), cached.get('mode'),
+                                              True, time.monotonic() - start)
+                else:
+                    firmware, mode = self._identify(conn, reader)
+                    device = DiscoveredDevice(port, key, baud, firmware, mode, False,
+                                              time.monotonic() - start)
+                self.cache.put(device)
+                return device
+        except (serial.SerialException, OSError) as e:
+            logger.debug("%s: %s", port, e)
+        finally:
+            conn.close()
+        return None
+
+    def lookup(self, port: str) -> Optional[DiscoveredDevice]:
+        """Cached result for the adapter currently on port, without probing"""
+        key = self.key_for(port)
+        entry = self.cache.get(key)
+        if not entry:
+            return None
+        return DiscoveredDevice(port, key, entry['baud'], entry.get('firmware'), entry.get('mode'), True)
+
+    @staticmethod
+    def key_for(port: str) -> str:
+        return port_identity(port)
+
+    def discover(self, ports: Optional[Iterable[str]] = None, all_ports: bool = False,
+                 first: bool = False) -> List[DiscoveredDevice]:
+        """Probe ports (default: USB serial adapters) concurrently
+
+        first=True returns as soon as one converter answers instead of
+        waiting for the sweeps of silent ports to run out.
+        """
+        if ports is None:
+            targets = [(info.device, port_key(info)) for info in list_candidates(all_ports)]
+        else:
+            targets = [(port, self.key_for(port)) for port in ports]
+        if not targets:
+            return []
+
+        found = []
+        pool = ThreadPoolExecutor(max_workers=min(self.max_workers, len(targets)))
+        futures = []
+        try:
+            futures += [pool.submit(self.probe, *target) for target in targets]
+            for future in as_completed(futures):
+                device = future.result()
+                if device:
+                    found.append(device)
+                    logger.info("✓ %s: converter at %s baud%s%s", device.port, device.baud,
+                                f", firmware {device.firmware}" if device.firmware else '',
+                                ' (cached)' if device.cached else '')
+                    if first:
+                        break
+        finally:
+            if first:
+                # Probes not started yet are dropped (shutdown's
+                # cancel_futures needs Python 3.9); running ones finish in
+                # the background and close their ports
+                for future in futures:
+                    future.cancel()
+            pool.shutdown(wait=not first)
+        order = {port: index for index, (port, _) in enumerate(targets)}
+        return sorted(found, key=lambda device: order[device.port])
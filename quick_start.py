@@ -6,8 +6,10 @@ Quick Start Script for Waveshare CAN Tool
 import sys
 import os
 from waveshare_can_tool import WaveshareCANTool, WorkMode, FrameType
+from event_log import configure_logging
 
 def main():
+    configure_logging()
     print("=== Waveshare CAN Tool - Quick Start ===")
     print()
     
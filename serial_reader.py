@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Event-driven serial receive engine
+Blocks on the port's file descriptor and wakes as soon as bytes arrive,
+replacing the in_waiting / sleep(0.01) polling loops
+"""
+
+import os
+import select
+import time
+from typing import Optional
+
+import serial
+
+
+class SerialReader:
+    """Wait-for-data reader shared by the CLI, GUI and analyzer monitors"""
+
+    def __init__(self, serial_conn: serial.Serial, chunk_size: int = 4096):
+        self.serial_conn = serial_conn
+        self.chunk_size = chunk_size
+
+        # POSIX ports expose a non-blocking fd we can select() on directly.
+        # Other backends (Windows) fall back to pyserial's own timed read,
+        # which also blocks in the driver until data or timeout.
+        self.fd: Optional[int] = None
+        try:
+            self.fd = serial_conn.fileno()
+        except (AttributeError, OSError, ValueError):
+            self.fd = None
+
+    def wait(self, timeout: Optional[float]) -> bool:
+        """Block until the port is readable or the timeout expires"""
+        if self.fd is None:
+            return self.serial_conn.in_waiting > 0
+
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        return bool(readable)
+
+    def read(self, timeout: Optional[float] = 0.2) -> bytes:
+        """Return whatever bytes arrive before the deadline (b'' on timeout)"""
+        if self.fd is None:
+            return self._read_fallback(timeout)
+
+        if not self.wait(timeout):
+            return b''
+
+        data = os.read(self.fd, self.chunk_size)
+        if not data:
+            # select() reported readiness but nothing came: the device is gone
+            raise serial.SerialException('device reports readiness to read but returned no data')
+        return data
+
+    def readinto(self, buffer: memoryview, timeout: Optional[float] = 0.2) -> int:
+        """Read available bytes straight into buffer; returns the count (0 on timeout)"""
+        if self.fd is None:
+            data = self._read_fallback(timeout, len(buffer))
+            buffer[:len(data)] = data
+            return len(data)
+
+        if not self.wait(timeout):
+            return 0
+
+        # readv() fills the caller's buffer directly, no intermediate bytes
+        count = os.readv(self.fd, [buffer])
+        if not count:
+            raise serial.SerialException('device reports readiness to read but returned no data')
+        return count
+
+    def read_until_deadline(self, deadline: float) -> bytes:
+        """Read one chunk, waiting at most until the monotonic deadline"""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return b''
+        return self.read(remaining)
+
+    def _read_fallback(self, timeout: Optional[float], limit: Optional[int] = None) -> bytes:
+        """Timed blocking read for ports without a selectable fd (at most limit bytes)"""
+        limit = self.chunk_size if limit is None else limit
+        if limit <= 0:
+            return b''
+        original_timeout = self.serial_conn.timeout
+        try:
+            self.serial_conn.timeout = timeout
+            data = self.serial_conn.read(1)
+            if not data:
+                return b''
+            waiting = self.serial_conn.in_waiting
+            if waiting:
+                data += self.serial_conn.read(min(waiting, limit - 1))
+            return data
+        finally:
+            self.serial_conn.timeout = original_timeout
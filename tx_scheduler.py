@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Cyclic transmit scheduler
+Sends periodic CAN messages on absolute monotonic deadlines, so the cost
+of each send never shifts the following ones, and keeps per-message
+jitter and overrun statistics
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from event_log import logger
+
+
+# Sleep until this close to a deadline, then spin for the last stretch
+SPIN_THRESHOLD_NS = 200_000
+
+
+class CyclicMessage:
+    """One periodic message and its timing statistics"""
+
+    __slots__ = ('name', 'can_id', 'data', 'extended', 'period_ns', 'offset_ns', 'count',
+                 'deadline_ns', 'sent', 'failed', 'overruns',
+                 'jitter_min_ns', 'jitter_max_ns', 'jitter_total_ns', 'active')
+
+    def __init__(self, name: str, can_id: int, data: bytes, period: float,
+                 offset: float = 0.0, extended: bool = False, count: int = 0):
+        self.name = name
+        self.can_id = can_id
+        self.data = data
+        self.extended = extended
+        self.period_ns = int(period * 1e9)  # 0 = send once
+        self.offset_ns = int(offset * 1e9)
+        self.count = count  # stop after this many sends (0 = forever)
+        self.deadline_ns = 0
+        self.sent = 0
+        self.failed = 0
+        self.overruns = 0  # periods skipped because a send came too late
+        self.jitter_min_ns = 0
+        self.jitter_max_ns = 0
+        self.jitter_total_ns = 0
+        self.active = True
+
+    def record(self, success: bool, lateness_ns: int):
+        if not success:
+            self.failed += 1
+            return
+        if not self.sent or lateness_ns < self.jitter_min_ns:
+            self.jitter_min_ns = lateness_ns
+        if not self.sent or lateness_ns > self.jitter_max_ns:
+            self.jitter_max_ns = lateness_ns
+        self.jitter_total_ns += lateness_ns
+        self.sent += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Send counts and lateness against the deadline, in microseconds"""
+        return {
+            'id': f"0x{self.can_id:03X}",
+            'period_ms': self.period_ns / 1e6,
+            'sent': self.sent,
+            'failed': self.failed,
+            'overruns': self.overruns,
+            'jitter_min_us': self.jitter_min_ns / 1e3,
+            'jitter_max_us': self.jitter_max_ns / 1e3,
+            'jitter_mean_us': self.jitter_total_ns / self.sent / 1e3 if self.sent else 0.0,
+        }
+
+
+class TxScheduler:
+    """Heap of absolute deadlines served by one transmit thread
+
+    send_frames receives a list of (can_id, data, extended) tuples for all
+    messages due at the same time and returns one result per frame with a
+    `success` attribute (WaveshareCANTool.send_can_frames fits). A message
+    that falls more than a whole period behind skips the missed periods
+    (counted as overruns) instead of bursting to catch up.
+    """
+
+    def __init__(self, send_frames: Callable[[List[tuple]], Sequence[Any]],
+                 on_sent: Optional[Callable[[List[CyclicMessage], Sequence[Any]], None]] = None,
+                 spin_threshold_ns: int = SPIN_THRESHOLD_NS):
+        self.send_frames = send_frames
+        self.on_sent = on_sent
+        self.spin_threshold_ns = spin_threshold_ns
+        self.messages: Dict[str, CyclicMessage] = {}
+
+        self._heap: List[tuple] = []
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._start_ns = 0
+
+    @classmethod
+    def from_test_config(cls, send_frames, testing: Dict[str, Any], interval: str = 'medium',
+                         **kwargs) -> 'TxScheduler':
+        """Schedule windows_config.json 'testing.test_frames' at a named test interval
+
+        Frames are staggered evenly across the period so they do not all
+        land on the bus at the same instant.
+        """
+        period = testing['test_intervals'][interval] / 1000.0
+        scheduler = cls(send_frames, **kwargs)
+        frames = testing.get('test_frames', [])
+        for index, frame in enumerate(frames):
+            scheduler.add(int(frame['id'], 16), bytes.fromhex(frame['data'].replace(' ', '')),
+                          period, offset=period * index / len(frames),
+                          name=frame.get('description'))
+        return scheduler
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def add(self, can_id: int, data: bytes, period: float, offset: float = 0.0,
+            extended: bool = False, name: Optional[str] = None, count: int = 0) -> CyclicMessage:
+        """Add a message sent every period seconds, first at offset after start"""
+        if period < 0 or offset < 0:
+            raise ValueError("period and offset must not be negative")
+        name = name or f"0x{can_id:03X}@{period * 1000:g}ms"
+        message = CyclicMessage(name, can_id, data, period, offset, extended, count)
+        with self._cond:
+            if name in self.messages:
+                raise ValueError(f"Message already scheduled: {name}")
+            self.messages[name] = message
+            if self._running:
+                self._push(message, time.monotonic_ns() + message.offset_ns)
+                self._cond.notify()
+        return message
+
+    def remove(self, name: str):
+        """Stop sending a message (its statistics stay readable)"""
+        with self._cond:
+            message = self.messages.pop(name, None)
+            if message:
+                message.active = False
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._start_ns = time.monotonic_ns()
+            self._heap.clear()
+            for message in self.messages.values():
+                self._push(message, self._start_ns + message.offset_ns)
+        self._thread = threading.Thread(target=self._worker)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, timeout: float = 1.0):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: message.stats() for name, message in self.messages.items()}
+
+    def _push(self, message: CyclicMessage, deadline_ns: int):
+        message.deadline_ns = deadline_ns
+        heapq.heappush(self._heap, (deadline_ns, next(self._sequence), message))
+
+    def _wait_until(self, deadline_ns: int) -> bool:
+        """Sleep (interruptibly) until the deadline; False if stopped or rescheduled"""
+        while True:
+            remaining = deadline_ns - time.monotonic_ns()
+            if remaining <= self.spin_threshold_ns:
+                break
+            self._cond.wait((remaining - self.spin_threshold_ns) / 1e9)
+            if not self._running or (self._heap and self._heap[0][0] < deadline_ns):
+                return False
+        # Release the lock for the final spin so add()/stop() never wait on it
+        self._cond.release()
+        try:
+            while time.monotonic_ns() < deadline_ns:
+                pass
+        finally:
+            self._cond.acquire()
+        return self._running
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while self._running and not self._heap:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                deadline_ns = self._heap[0][0]
+                if not self._wait_until(deadline_ns):
+                    continue
+
+                # Everything due by now goes out in one write
+                now = time.monotonic_ns()
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    _, _, message = heapq.heappop(self._heap)
+                    if message.active:
+                        due.append(message)
+            if not due:
+                continue
+
+            try:
+                results = self.send_frames([(m.can_id, m.data, m.extended) for m in due])
+            except Exception as e:
+                logger.error("✗ Cyclic transmit failed: %s", e)
+                results = [None] * len(due)
+            sent_ns = time.monotonic_ns()
+
+            with self._cond:
+                for message, result in zip(due, results):
+                    message.record(bool(result and result.success), sent_ns - message.deadline_ns)
+                    if not message.period_ns or (message.count and message.sent + message.failed >= message.count):
+                        message.active = False
+                        continue
+                    next_deadline = message.deadline_ns + message.period_ns
+                    if next_deadline <= sent_ns:
+                        # Fell behind: skip to the next deadline still ahead
+                        missed = (sent_ns - next_deadline) // message.period_ns + 1
+                        message.overruns += missed
+                        next_deadline += missed * message.period_ns
+                    self._push(message, next_deadline)
+
+            if self.on_sent:
+                self.on_sent(due, results)
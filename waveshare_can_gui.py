@@ -6,11 +6,10 @@ Graphical interface for configuring RS232/485/422 to CAN converter
 
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, scrolledtext
-import threading
-import time
-from datetime import datetime
 import json
 from waveshare_can_tool import WaveshareCANTool, WorkMode, FrameType, DeviceConfig
+from event_log import configure_logging
+from tx_scheduler import TxScheduler
 
 
 class WaveshareCANGUI:
@@ -23,6 +22,7 @@ class WaveshareCANGUI:
         self.tool = WaveshareCANTool()
         self.is_connected = False
         self.monitor_running = False
+        self.auto_test_scheduler = None
         
         # Create GUI
         self.create_widgets()
@@ -47,6 +47,11 @@ class WaveshareCANGUI:
         
         # Test tab
         self.create_test_tab()
+        
+        # Status bar: live bus load
+        self.bus_load_var = tk.StringVar(value="")
+        ttk.Label(self.root, textvariable=self.bus_load_var, relief='sunken', anchor='w').pack(side='bottom', fill='x')
+        self.root.after(1000, self.update_status_bar)
     
     def create_connection_tab(self):
         """Create connection tab"""
@@ -198,7 +203,8 @@ class WaveshareCANGUI:
         auto_frame.pack(fill='x', padx=10, pady=5)
         
         self.auto_test_var = tk.BooleanVar()
-        ttk.Checkbutton(auto_frame, text="Enable Auto Test", variable=self.auto_test_var).pack(side='left', padx=5)
+        ttk.Checkbutton(auto_frame, text="Enable Auto Test", variable=self.auto_test_var,
+                        command=self.toggle_auto_test).pack(side='left', padx=5)
         
         ttk.Label(auto_frame, text="Interval (ms):").pack(side='left', padx=5)
         self.auto_interval_var = tk.StringVar(value="1000")
@@ -232,6 +238,7 @@ class WaveshareCANGUI:
         """Disconnect from the device"""
         if self.monitor_running:
             self.stop_monitor()
+        self.stop_auto_test()
         
         self.tool.disconnect()
         self.is_connected = False
@@ -353,32 +360,45 @@ class WaveshareCANGUI:
         
         if not self.monitor_running:
             self.monitor_running = True
-            self.monitor_thread = threading.Thread(target=self.monitor_worker)
-            self.monitor_thread.daemon = True
-            self.monitor_thread.start()
+            # The tool's monitor thread is the only serial reader; the
+            # display drains its own queue and only loses its own frames
+            self.monitor_subscription = self.tool.bus.subscribe('display', policy='drop_oldest')
+            if not self.tool.is_monitoring:
+                self.tool.start_monitoring()
+            self.root.after(100, self.update_monitor)
             self.log_message("Monitor started")
     
     def stop_monitor(self):
         """Stop monitoring"""
         if self.monitor_running:
             self.monitor_running = False
-            self.log_message("Monitor stopped")
+            self.tool.bus.unsubscribe(self.monitor_subscription)
+            dropped = self.monitor_subscription.dropped
+            self.tool.stop_monitoring()
+            if dropped:
+                self.log_message(f"Monitor stopped ({dropped} frames not displayed)")
+            else:
+                self.log_message("Monitor stopped")
     
-    def monitor_worker(self):
-        """Monitor worker thread"""
-        while self.monitor_running and self.tool.serial_conn and self.tool.serial_conn.is_open:
-            try:
-                if self.tool.serial_conn.in_waiting > 0:
-                    data = self.tool.serial_conn.read(self.tool.serial_conn.in_waiting)
-                    timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-                    hex_data = data.hex()
-                    
-                    self.root.after(0, self.log_message, f"[{timestamp}] RX: {hex_data}")
-                
-                time.sleep(0.01)
-            except Exception as e:
-                self.root.after(0, self.log_message, f"Monitor error: {e}")
-                break
+    def update_monitor(self):
+        """Show frames queued for the display"""
+        if not self.monitor_running:
+            return
+        frames = self.monitor_subscription.get_many(500)
+        if frames:
+            clock = self.tool.clock
+            self.log_message("\n".join(
+                f"[{clock.format(frame.timestamp_ns)}] RX: ID={frame.id_text}, Data={frame.data.hex()}"
+                for frame in frames))
+        self.root.after(50 if frames else 100, self.update_monitor)
+    
+    def update_status_bar(self):
+        """Refresh the bus load figures once a second"""
+        if self.is_connected:
+            self.bus_load_var.set(self.tool.bus_load.summary())
+        else:
+            self.bus_load_var.set("")
+        self.root.after(1000, self.update_status_bar)
     
     def log_message(self, message):
         """Log message to monitor display"""
@@ -424,35 +444,49 @@ class WaveshareCANGUI:
             messagebox.showerror("Error", "Please connect to device first")
             return
         
+        if self.auto_test_scheduler and self.auto_test_scheduler.running:
+            return
+        
+        try:
+            can_id = int(self.test_id_var.get(), 16)
+            data = bytes.fromhex(self.test_data_var.get().replace(" ", ""))
+            interval = int(self.auto_interval_var.get()) / 1000.0
+        except ValueError:
+            messagebox.showerror("Error", "Invalid CAN ID, data or interval")
+            return
+        
+        # Absolute deadlines: the period no longer drifts by the send time
+        self.auto_test_scheduler = TxScheduler(self.tool.send_can_frames, on_sent=self.auto_test_sent)
+        self.auto_test_scheduler.add(can_id, data, interval)
         self.auto_test_var.set(True)
-        self.auto_test_thread = threading.Thread(target=self.auto_test_worker)
-        self.auto_test_thread.daemon = True
-        self.auto_test_thread.start()
+        self.auto_test_scheduler.start()
+    
+    def toggle_auto_test(self):
+        """Checkbox handler"""
+        if not self.auto_test_var.get():
+            self.stop_auto_test()
     
     def stop_auto_test(self):
         """Stop automatic test"""
         self.auto_test_var.set(False)
+        if self.auto_test_scheduler and self.auto_test_scheduler.running:
+            self.auto_test_scheduler.stop()
+            for name, stats in self.auto_test_scheduler.stats().items():
+                self.log_message(f"Auto test {name}: {stats['sent']} sent, {stats['overruns']} overruns, "
+                                 f"jitter {stats['jitter_mean_us']:.0f}us mean / {stats['jitter_max_us']:.0f}us max")
     
-    def auto_test_worker(self):
-        """Auto test worker thread"""
-        while self.auto_test_var.get():
-            try:
-                can_id = int(self.test_id_var.get(), 16)
-                data_str = self.test_data_var.get().replace(" ", "")
-                data = bytes.fromhex(data_str)
-                interval = int(self.auto_interval_var.get()) / 1000.0
-                
-                if self.tool.send_can_frame(can_id, data):
-                    self.root.after(0, self.log_message, f"AUTO TX: ID=0x{can_id:03X}, Data={data.hex()}")
-                
-                time.sleep(interval)
-            except Exception as e:
-                self.root.after(0, self.log_message, f"Auto test error: {e}")
-                break
+    def auto_test_sent(self, messages, results):
+        """Scheduler callback (transmit thread)"""
+        for message, result in zip(messages, results):
+            if result and result.success:
+                self.root.after(0, self.log_message,
+                                f"AUTO TX: ID=0x{message.can_id:03X}, Data={message.data.hex()}")
 
 
 def main():
     """Main function"""
+    # Frames go to the Monitor tab, not the console
+    configure_logging(quiet=True)
     root = tk.Tk()
     app = WaveshareCANGUI(root)
     root.mainloop()
@@ -7,7 +7,6 @@ Interface graphique spécialement optimisée pour Windows
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, scrolledtext
 import threading
-import time
 import json
 import os
 import sys
@@ -17,6 +16,11 @@ from pathlib import Path
 # Import du module principal
 try:
     from waveshare_can_tool import WaveshareCANTool, WorkMode, FrameType, DeviceConfig
+    from event_log import configure_logging
+    from connection_supervisor import ReconnectPolicy
+    from port_discovery import PortDiscovery
+    from can_filter import FrameFilter
+    from frame_bus import FrameBus
 except ImportError:
     # Fallback si le module n'est pas trouvé
     print("Erreur: Module waveshare_can_tool non trouvé")
@@ -39,12 +43,26 @@ class WaveshareCANGUIWindows:
         
         # Initialiser l'outil
         self.tool = WaveshareCANTool()
+        self.discovery = PortDiscovery()
+        self.discovered = {}  # port -> DiscoveredDevice
         self.is_connected = False
         self.monitor_running = False
         
         # Charger la configuration Windows
         self.load_windows_config()
         
+        # Files d'abonnés selon performance_settings.buffer_management
+        buffer_management = self.windows_config.get('performance_settings', {}).get('buffer_management')
+        if buffer_management:
+            self.tool.bus = FrameBus.from_config(buffer_management)
+        
+        # Rotation du journal de monitoring selon logging
+        self.tool.logging_config = self.windows_config.get('logging', {})
+        
+        # Reconnexion automatique selon error_handling
+        if 'error_handling' in self.windows_config:
+            self.tool.supervisor.policy = ReconnectPolicy.from_config(self.windows_config['error_handling'])
+        
         # Créer l'interface
         self.create_widgets()
         
@@ -94,6 +112,12 @@ class WaveshareCANGUIWindows:
         self.notebook.grid(row=2, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(10, 0))
         main_frame.rowconfigure(2, weight=1)
         
+        # Barre d'état: charge du bus en direct
+        self.bus_load_var = tk.StringVar(value="")
+        ttk.Label(main_frame, textvariable=self.bus_load_var, relief='sunken', anchor='w').grid(
+            row=3, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(5, 0))
+        self.root.after(1000, self.update_status_bar)
+        
         # Onglets
         self.create_config_tab()
         self.create_monitor_tab()
@@ -244,12 +268,32 @@ class WaveshareCANGUIWindows:
             print(f"Ports COM détectés: {ports}")
         except Exception as e:
             print(f"Erreur lors de la détection des ports: {e}")
+        
+        # Recherche du convertisseur en arrière-plan (tous les ports en parallèle)
+        if self.windows_config.get("device_settings", {}).get("auto_detect_port"):
+            threading.Thread(target=self.discover_ports, daemon=True).start()
+    
+    def discover_ports(self):
+        """Sonder les ports et présélectionner le convertisseur trouvé"""
+        found = self.discovery.discover()
+        self.root.after(0, self.show_discovered, found)
+    
+    def show_discovered(self, found):
+        """Afficher le résultat de la détection (thread GUI)"""
+        self.discovered = {device.port: device for device in found}
+        if found and not self.is_connected:
+            self.port_combo.set(found[0].port)
+            print(f"✓ Convertisseur détecté sur {found[0].port} à {found[0].baud} bauds")
     
     def connect_device(self):
         """Connecter au périphérique"""
         port = self.port_var.get()
         self.tool.port = port
         
+        # Débit connu (détection ou cache) sinon 115200
+        device = self.discovered.get(port) or self.discovery.lookup(port)
+        self.tool.baudrate = device.baud if device else 115200
+        
         if self.tool.connect():
             self.is_connected = True
             self.status_var.set("Connecté")
@@ -352,33 +396,58 @@ class WaveshareCANGUIWindows:
         
         if not self.monitor_running:
             self.monitor_running = True
-            self.monitor_thread = threading.Thread(target=self.monitor_worker)
-            self.monitor_thread.daemon = True
-            self.monitor_thread.start()
-            self.log_message("Monitoring démarré")
+            # Filtres d'identifiants de monitoring.filters (None si désactivés)
+            filters = self.windows_config.get('monitoring', {}).get('filters', {})
+            self.tool.frame_filter = FrameFilter.from_config(filters)
+            # Le thread de monitoring de l'outil est le seul lecteur du port;
+            # l'affichage vide sa propre file et ne perd que ses trames
+            self.monitor_subscription = self.tool.bus.subscribe('display')
+            if not self.tool.is_monitoring:
+                self.tool.start_monitoring(self.monitor_log_path())
+            self.root.after(100, self.update_monitor)
+            if self.tool.log_file:
+                self.log_message(f"Monitoring démarré (journal: {self.tool.log_file})")
+            else:
+                self.log_message("Monitoring démarré")
+    
+    def monitor_log_path(self):
+        """Fichier journal du monitoring dans log_directory (None si logging désactivé)"""
+        if not self.windows_config.get('logging', {}).get('enabled', False):
+            return None
+        paths = self.windows_config.get('windows_specific', {}).get('file_paths', {})
+        directory = os.path.expandvars(paths.get('log_directory', 'logs'))
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except OSError as e:
+            self.log_message(f"Journal désactivé: {e}")
+            return None
+        return os.path.join(directory, f"can_monitor_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
     
     def stop_monitor(self):
         """Arrêter le monitoring"""
         if self.monitor_running:
             self.monitor_running = False
-            self.log_message("Monitoring arrêté")
+            self.tool.bus.unsubscribe(self.monitor_subscription)
+            dropped = self.monitor_subscription.dropped
+            self.tool.stop_monitoring()
+            if dropped:
+                self.log_message(f"Monitoring arrêté ({dropped} trames non affichées)")
+            else:
+                self.log_message("Monitoring arrêté")
     
-    def monitor_worker(self):
-        """Thread de monitoring"""
-        while self.monitor_running and self.tool.serial_conn and self.tool.serial_conn.is_open:
-            try:
-                if self.tool.serial_conn.in_waiting > 0:
-                    data = self.tool.serial_conn.read(self.tool.serial_conn.in_waiting)
-                    timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-                    hex_data = data.hex().upper()
-                    
-                    message = f"[{timestamp}] RX: {hex_data}"
-                    self.root.after(0, self.log_message, message)
-                
-                time.sleep(0.01)
-            except Exception as e:
-                self.root.after(0, self.log_message, f"Erreur monitoring: {e}")
-                break
+    def update_monitor(self):
+        """Afficher les trames en attente"""
+        if not self.monitor_running:
+            return
+        frames = self.monitor_subscription.get_many(500)
+        if frames:
+            clock = self.tool.clock
+            self.monitor_text.insert(tk.END, "".join(
+                f"[{clock.format(frame.timestamp_ns)}] RX: ID={frame.id_text}, "
+                f"Data={frame.data.hex().upper()}\n"
+                for frame in frames))
+            self.monitor_text.see(tk.END)
+        self.root.after(50 if frames else 100, self.update_monitor)
     
     def clear_monitor(self):
         """Effacer l'affichage du monitoring"""
@@ -548,6 +617,14 @@ class WaveshareCANGUIWindows:
         except Exception as e:
             messagebox.showerror("Erreur", f"Erreur info périphérique: {e}")
     
+    def update_status_bar(self):
+        """Rafraîchir la charge du bus chaque seconde"""
+        if self.is_connected:
+            self.bus_load_var.set(self.tool.bus_load.summary())
+        else:
+            self.bus_load_var.set("")
+        self.root.after(1000, self.update_status_bar)
+    
     def log_message(self, message):
         """Ajouter un message au log de monitoring"""
         timestamp = datetime.now().strftime("%H:%M:%S")
@@ -557,6 +634,8 @@ class WaveshareCANGUIWindows:
 
 def main():
     """Fonction principale"""
+    # Les trames s'affichent dans l'onglet Monitoring, pas dans la console
+    configure_logging(quiet=True)
     try:
         root = tk.Tk()
         app = WaveshareCANGUIWindows(root)
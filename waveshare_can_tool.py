@@ -12,22 +12,62 @@ Features:
 
 import serial
 import time
-import struct
 import threading
 import json
 import os
 from datetime import datetime
 from enum import Enum
-from dataclasses import dataclass, asdict
-from typing import Optional, List, Dict, Any
+from dataclasses import dataclass, asdict, replace
+from typing import Optional, List, Dict, Any, Iterable, NamedTuple, Tuple
 
+import logging
 
-class WorkMode(Enum):
-    """Device working modes"""
-    TRANSPARENT = 1
-    TRANSPARENT_WITH_ID = 2
-    FORMAT_CONVERSION = 3
-    MODBUS_RTU = 4
+from event_log import logger, frame_logger, stats_logger, configure_logging, RateSummary
+from log_writer import LogWriter
+from can_capture import CaptureWriter
+from can_codec import WorkMode, SessionClock, FrameDecoder, encode_frame, encode_frame_into
+from can_frame import RECORD, CanFrame
+from frame_bus import FrameBus
+from can_filter import FrameFilter, FilterPlan, optimize_hardware_filter
+from tx_scheduler import TxScheduler
+from can_timing import TxRateLimiter
+from bus_load import BusLoadEstimator, payload_bits
+from serial_reader import SerialReader
+from connection_supervisor import ConnectionSupervisor
+from can_bitrate import BitrateDetection, detect_can_bitrate
+from device_info import DeviceInfoCache, port_identity
+
+
+# Lines that end an AT command response
+TERMINAL_RESPONSES = ('OK', 'ERROR')
+
+
+def _is_terminal(line: bytes) -> bool:
+    """OK/ERROR line, possibly preceded by binary frame bytes received just before it"""
+    line = line.strip()
+    for token in TERMINAL_RESPONSES:
+        if line.endswith(token.encode()):
+            prefix = line[:-len(token)]
+            return not prefix or any(byte < 0x20 or byte > 0x7E for byte in prefix)
+    return False
+
+
+def response_state(response: bytes) -> Tuple[bool, bool]:
+    """Return (final, line_complete) for a partially received AT response"""
+    final = any(_is_terminal(line) for line in bytes(response).splitlines())
+    return final, response.endswith(b'\n')
+
+
+def response_end(response: bytes) -> Optional[int]:
+    """Offset just past the first OK/ERROR line, or None before it has arrived"""
+    start = 0
+    while True:
+        newline = response.find(b'\n', start)
+        if newline < 0:
+            return None
+        if _is_terminal(response[start:newline]):
+            return newline + 1
+        start = newline + 1
 
 
 class FrameType(Enum):
@@ -53,16 +93,81 @@ class DeviceConfig:
     device_id: int = 0x01
 
 
+class TxResult(NamedTuple):
+    """Outcome of one frame in a send_can_frames() batch"""
+    offset: int  # byte offset of the frame in the written buffer
+    length: int
+    success: bool
+    error: Optional[str] = None
+
+
 class WaveshareCANTool:
     """Main class for Waveshare CAN Tool"""
     
     def __init__(self, port: str = '/dev/tty.usbserial-1140'):
         self.port = port
+        # Host side of the serial link (see port_discovery for finding it)
+        self.baudrate = 115200
         self.serial_conn: Optional[serial.Serial] = None
         self.config = DeviceConfig()
         self.is_monitoring = False
         self.monitor_thread: Optional[threading.Thread] = None
         self.log_file: Optional[str] = None
+        self.log_writer: Optional[LogWriter] = None
+        # Extra LogWriter options (flush_interval, fsync, max_file_size, ...)
+        self.log_settings: Dict[str, Any] = {}
+        # windows_config.json 'logging' section (rotation size and count)
+        self.logging_config: Dict[str, Any] = {}
+        self.capture_writer: Optional[CaptureWriter] = None
+        self.clock = SessionClock()
+        
+        # Received frames fan out to GUI / web / other consumers from the
+        # one monitor thread; nobody else reads serial_conn while monitoring
+        self.bus = FrameBus()
+        
+        # While an AT command is in flight during monitoring, the monitor
+        # thread hands the received bytes to it instead of the decoder
+        self._response: Optional[bytearray] = None
+        self._response_ready = threading.Condition()
+        self._command_lock = threading.Lock()
+        
+        # Software acceptance filter (whitelist / blacklist), applied
+        # before frames are displayed, published, logged or captured
+        self.frame_filter: Optional[FrameFilter] = None
+        
+        # Quiet high-throughput mode: periodic summaries instead of
+        # per-frame records (see event_log.configure_logging)
+        self.summary_interval: Optional[float] = None
+        self.tx_summary = RateSummary('TX')
+        
+        # Paces writes to what the CAN bus / UART can carry so the
+        # converter's transmit buffer never overflows (None = unpaced)
+        self.tx_limiter: Optional[TxRateLimiter] = TxRateLimiter(self.config)
+        
+        # Bus / UART utilisation over 1 s, 10 s and 60 s windows
+        self.bus_load = BusLoadEstimator(self.config)
+        
+        # Reopens the port from the monitor thread after a USB reset or
+        # unplug (None = monitoring ends on the first port error)
+        self.supervisor: Optional[ConnectionSupervisor] = ConnectionSupervisor(self)
+        
+        # AT command transactions: default deadline, slower commands, and
+        # how long to wait for more lines after a non-terminal line
+        self.command_timeout = 1.0
+        self.command_timeouts = {'AT+SAVE': 2.0, 'AT+RST': 2.0}
+        self.response_gap = 0.02
+        self.response_times: Dict[str, float] = {}
+        
+        # Identification responses per adapter (memory + disk, with TTL);
+        # checked against AT+VER once per connection
+        self.info_cache: Optional[DeviceInfoCache] = DeviceInfoCache()
+        self.device_key: Optional[str] = None
+        self._info_verified = False
+        
+        # Last configuration the device confirmed (None = unknown), and
+        # whether confirmed changes still need AT+SAVE
+        self.device_shadow: Optional[DeviceConfig] = None
+        self.unsaved_changes = False
         
         # Command constants
         self.CMD_PREFIX = b'\xAA\x55'  # Command prefix
@@ -88,52 +193,166 @@ class WaveshareCANTool:
         try:
             self.serial_conn = serial.Serial(
                 port=self.port,
-                baudrate=115200,
+                baudrate=self.baudrate,
                 bytesize=8,
                 parity='N',
                 stopbits=1,
                 timeout=2
             )
-            print(f"✓ Connected to {self.port}")
+            self.device_shadow = None
+            self.device_key = None
+            self._info_verified = False
+            logger.info("✓ Connected to %s", self.port)
             return True
         except Exception as e:
-            print(f"✗ Connection failed: {e}")
+            logger.error("✗ Connection failed: %s", e)
             return False
     
     def disconnect(self):
-        """Disconnect from the device"""
+        """Disconnect from the device, stopping monitoring first"""
+        # A port closed under the monitor would look like a lost connection
+        # and the supervisor would reopen it
+        if self.is_monitoring:
+            self.stop_monitoring()
         if self.serial_conn and self.serial_conn.is_open:
             self.serial_conn.close()
-            print("✓ Disconnected")
+            logger.info("✓ Disconnected")
     
-    def send_command(self, command: str, wait_response: bool = True) -> Optional[str]:
-        """Send AT command to device"""
+    def send_command(self, command: str, wait_response: bool = True,
+                     timeout: Optional[float] = None) -> Optional[str]:
+        """Send AT command to device
+        
+        Returns as soon as an OK/ERROR line arrives, or once a complete line
+        has been followed by response_gap seconds of silence. The wait is
+        bounded by a per-command deadline and the elapsed time is recorded
+        in response_times. While monitoring, the response is received
+        through the monitor thread, the port's only reader.
+        """
         if not self.serial_conn or not self.serial_conn.is_open:
-            print("✗ Not connected to device")
+            logger.error("✗ Not connected to device")
             return None
         
+        routed = (self.is_monitoring and self.monitor_thread is not None
+                  and self.monitor_thread.is_alive()
+                  and self.monitor_thread is not threading.current_thread())
+        with self._command_lock:
+            try:
+                return self._transact(command, wait_response, timeout, routed)
+            finally:
+                if routed:
+                    with self._response_ready:
+                        self._response = None
+    
+    def _transact(self, command: str, wait_response: bool, timeout: Optional[float],
+                  routed: bool) -> Optional[str]:
         try:
             # Format command
             cmd_bytes = f"{command}\r\n".encode('utf-8')
+            if routed:
+                with self._response_ready:
+                    self._response = bytearray()
             
             # Send command
+            start = time.monotonic()
             self.serial_conn.write(cmd_bytes)
             self.serial_conn.flush()
             
             if wait_response:
-                time.sleep(0.1)
-                response = self.serial_conn.read(1000)
+                if timeout is None:
+                    timeout = self.command_timeouts.get(command.split('=')[0], self.command_timeout)
+                if routed:
+                    response = self._await_response(start + timeout)
+                else:
+                    response = self._read_response(start + timeout)
+                self.response_times[command] = time.monotonic() - start
+                logger.debug("%s -> %r (%.1f ms)", command, response,
+                             self.response_times[command] * 1000)
                 if response:
                     return response.decode('utf-8', errors='ignore').strip()
                 else:
                     return None
             return "OK"
         except Exception as e:
-            print(f"✗ Command failed: {e}")
+            logger.error("✗ Command failed: %s", e)
             return None
     
-    def get_device_info(self) -> Dict[str, Any]:
-        """Get device information"""
+    def _read_response(self, deadline: float) -> bytes:
+        """Collect response bytes until a terminal line or the deadline"""
+        reader = SerialReader(self.serial_conn)
+        response = bytearray()
+        while True:
+            final, line_complete = response_state(response)
+            if final:
+                break
+            
+            remaining = deadline - time.monotonic()
+            wait = min(remaining, self.response_gap) if line_complete else remaining
+            if wait <= 0:
+                break
+            
+            chunk = reader.read(wait)
+            if not chunk and line_complete:
+                break
+            response += chunk
+        return bytes(response)
+    
+    def _await_response(self, deadline: float) -> bytes:
+        """Like _read_response, for bytes the monitor thread routes to us"""
+        with self._response_ready:
+            while True:
+                final, line_complete = response_state(self._response)
+                if final:
+                    break
+                
+                remaining = deadline - time.monotonic()
+                wait = min(remaining, self.response_gap) if line_complete else remaining
+                if wait <= 0:
+                    break
+                
+                received = len(self._response)
+                self._response_ready.wait(wait)
+                if line_complete and len(self._response) == received:
+                    break
+            return bytes(self._response)
+    
+    def _route_response(self, data) -> int:
+        """Append received bytes to the pending AT response; returns bytes taken"""
+        with self._response_ready:
+            response = self._response
+            if response is None or response_end(response) is not None:
+                return 0
+            size = len(response)
+            response += data
+            end = response_end(response)
+            if end is not None:
+                del response[end:]
+            self._response_ready.notify_all()
+            return len(response) - size
+    
+    def get_device_info(self, refresh: bool = False) -> Dict[str, Any]:
+        """Get device information
+        
+        Served from info_cache after the first probe. The first call on a
+        connection confirms the cached entry with a single AT+VER and
+        probes again if the firmware changed; refresh=True always probes.
+        """
+        cache = self.info_cache
+        if cache is not None:
+            if self.device_key is None:
+                self.device_key = port_identity(self.port)
+            entry = None if refresh else cache.get(self.device_key)
+            if entry is not None:
+                if self._info_verified:
+                    return entry['info']
+                firmware = self.send_command('AT+VER')
+                if firmware == 'OK':
+                    firmware = None
+                if (firmware or None) == entry['firmware']:
+                    self._info_verified = True
+                    return entry['info']
+                logger.info("Firmware changed (%r -> %r), probing device again",
+                            entry['firmware'], firmware)
+        
         info = {}
         
         # Try different info commands
@@ -144,8 +363,18 @@ class WaveshareCANTool:
             if response and response != "OK":
                 info[cmd] = response
         
+        # No answer at all (device busy or unplugged) is not worth remembering
+        if cache is not None and info:
+            cache.put(self.device_key, info)
+            self._info_verified = True
         return info
     
+    def invalidate_device_info(self):
+        """Forget the cached identification of the connected device"""
+        self._info_verified = False
+        if self.info_cache is not None:
+            self.info_cache.invalidate(self.device_key or port_identity(self.port))
+    
     def configure_uart(self, baud: int = 115200, data_bits: int = 8, 
                       stop_bits: int = 1, parity: str = 'N') -> bool:
         """Configure UART parameters"""
@@ -159,10 +388,12 @@ class WaveshareCANTool:
             self.config.uart_data_bits = data_bits
             self.config.uart_stop_bits = stop_bits
             self.config.uart_parity = parity
-            print(f"✓ UART configured: {baud}bps, {data_bits}{parity}{stop_bits}")
+            self._confirm(uart_baud=baud, uart_data_bits=data_bits,
+                          uart_stop_bits=stop_bits, uart_parity=parity)
+            logger.info("✓ UART configured: %sbps, %s%s%s", baud, data_bits, parity, stop_bits)
             return True
         else:
-            print(f"✗ UART configuration failed: {response}")
+            logger.error("✗ UART configuration failed: %s", response)
             return False
     
     def configure_can(self, baud: int = 500000, frame_type: FrameType = FrameType.STANDARD) -> bool:
@@ -176,12 +407,17 @@ class WaveshareCANTool:
         if response and 'OK' in response:
             self.config.can_baud = baud
             self.config.can_frame_type = frame_type
-            print(f"✓ CAN configured: {baud}bps, {frame_type.name} frame")
+            self._confirm(can_baud=baud, can_frame_type=frame_type)
+            logger.info("✓ CAN configured: %sbps, %s frame", baud, frame_type.name)
             return True
         else:
-            print(f"✗ CAN configuration failed: {response}")
+            logger.error("✗ CAN configuration failed: %s", response)
             return False
     
+    def detect_can_baud(self, **options) -> BitrateDetection:
+        """Find the CAN bus rate by listening at each standard rate (see can_bitrate)"""
+        return detect_can_bitrate(self, **options)
+    
     def set_work_mode(self, mode: WorkMode) -> bool:
         """Set device working mode"""
         cmd = self.COMMANDS['set_mode'].format(mode=mode.value)
@@ -189,10 +425,11 @@ class WaveshareCANTool:
         
         if response and 'OK' in response:
             self.config.work_mode = mode
-            print(f"✓ Work mode set to: {mode.name}")
+            self._confirm(work_mode=mode)
+            logger.info("✓ Work mode set to: %s", mode.name)
             return True
         else:
-            print(f"✗ Work mode setting failed: {response}")
+            logger.error("✗ Work mode setting failed: %s", response)
             return False
     
     def set_can_filter(self, filter_id: int = 0x000, filter_mask: int = 0x000) -> bool:
@@ -203,21 +440,39 @@ class WaveshareCANTool:
         if response and 'OK' in response:
             self.config.can_filter_id = filter_id
             self.config.can_filter_mask = filter_mask
-            print(f"✓ CAN filter set: ID=0x{filter_id:03X}, Mask=0x{filter_mask:03X}")
+            self._confirm(can_filter_id=filter_id, can_filter_mask=filter_mask)
+            logger.info("✓ CAN filter set: ID=0x%03X, Mask=0x%03X", filter_id, filter_mask)
             return True
         else:
-            print(f"✗ CAN filter setting failed: {response}")
+            logger.error("✗ CAN filter setting failed: %s", response)
             return False
     
+    def set_can_filter_ids(self, ids: Iterable[int], traffic: Optional[Dict[int, float]] = None) -> Optional[FilterPlan]:
+        """Program the hardware filter with the tightest id/mask accepting ids
+        
+        The device holds a single id/mask pair, so IDs outside the wanted
+        set may still pass; see the plan's extra_ids and pass_rate.
+        """
+        plan = optimize_hardware_filter(ids, max_pairs=1, traffic=traffic,
+                                        extended=self.config.can_frame_type == FrameType.EXTENDED)
+        filter_id, filter_mask = plan.pairs[0]
+        logger.info("Filter plan: %s wanted IDs, %s accepted (%s extra)",
+                    plan.wanted_ids, plan.accepted_ids, plan.extra_ids)
+        if plan.pass_rate is not None:
+            logger.info("Predicted pass-through: %.1f%% of traffic (%.1f%% wanted)",
+                        plan.pass_rate * 100, plan.wanted_rate * 100)
+        return plan if self.set_can_filter(filter_id, filter_mask) else None
+    
     def save_config(self) -> bool:
         """Save configuration to device"""
         response = self.send_command(self.COMMANDS['save_config'])
         
         if response and 'OK' in response:
-            print("✓ Configuration saved to device")
+            self.unsaved_changes = False
+            logger.info("✓ Configuration saved to device")
             return True
         else:
-            print(f"✗ Configuration save failed: {response}")
+            logger.error("✗ Configuration save failed: %s", response)
             return False
     
     def reset_device(self) -> bool:
@@ -225,84 +480,292 @@ class WaveshareCANTool:
         response = self.send_command(self.COMMANDS['reset'])
         time.sleep(1)  # Wait for reset
         
-        print("✓ Device reset")
+        # The device reloads its saved settings: our shadow is stale
+        self.device_shadow = None
+        self.unsaved_changes = False
+        self.invalidate_device_info()
+        
+        logger.info("✓ Device reset")
         return True
     
+    def _confirm(self, **fields):
+        """Record settings the device acknowledged in the shadow"""
+        if self.device_shadow is not None:
+            for name, value in fields.items():
+                setattr(self.device_shadow, name, value)
+        self.unsaved_changes = True
+    
     def send_can_frame(self, can_id: int, data: bytes, extended: bool = False) -> bool:
         """Send CAN frame"""
         if not self.serial_conn or not self.serial_conn.is_open:
             return False
         
         try:
-            # Format CAN frame for transmission
-            if self.config.work_mode == WorkMode.TRANSPARENT:
-                # In transparent mode, send raw data
-                self.serial_conn.write(data)
-            else:
-                # Format frame with ID (implementation depends on device protocol)
-                frame_header = struct.pack('<I', can_id)
-                frame_data = frame_header + data
-                self.serial_conn.write(frame_data)
+            # Format CAN frame for transmission (raw data in transparent mode)
+            extended = extended or self.config.can_frame_type == FrameType.EXTENDED
+            frame_data = encode_frame(self.config.work_mode, can_id, data, extended)
+            if self.tx_limiter:
+                self.tx_limiter.acquire(self.tx_limiter.cost(len(data), extended))
+            self.serial_conn.write(frame_data)
             
-            print(f"✓ CAN frame sent: ID=0x{can_id:03X}, Data={data.hex()}")
+            self.bus_load.add_payload('tx', len(data), extended, len(frame_data))
+            self.tx_summary.add(1, len(frame_data))
+            if frame_logger.isEnabledFor(logging.INFO):
+                frame_logger.info("✓ CAN frame sent: ID=0x%03X, Data=%s", can_id, data.hex())
+            if self.summary_interval:
+                self.tx_summary.maybe_report(self.summary_interval)
             return True
         except Exception as e:
-            print(f"✗ CAN frame send failed: {e}")
+            self.tx_summary.add(0, 0, errors=1)
+            logger.error("✗ CAN frame send failed: %s", e)
             return False
     
-    def start_monitoring(self, log_file: Optional[str] = None):
-        """Start monitoring CAN traffic"""
+    def send_can_frames(self, frames: Iterable, extended: bool = False) -> List[TxResult]:
+        """Send many CAN frames with as few serial writes as possible
+        
+        frames yields CanFrame objects or (can_id, data) / (can_id, data,
+        extended) tuples; a FrameBatch can be passed directly.
+        All frames are encoded into one contiguous buffer which is written
+        in a single call; frames that fail to encode are skipped and
+        reported, the rest share the outcome of the write. With tx_limiter
+        set, the buffer is split where the bus needs time to catch up.
+        """
+        if not self.serial_conn or not self.serial_conn.is_open:
+            return [TxResult(0, 0, False, "Not connected") for _ in frames]
+        
+        mode = self.config.work_mode
+        default_extended = extended or self.config.can_frame_type == FrameType.EXTENDED
+        buffer = bytearray()
+        results = []
+        costs = []
+        payloads = []
+        
+        for frame in frames:
+            remote, dlc = False, None
+            if isinstance(frame, CanFrame):
+                can_id, data = frame.can_id, frame.data
+                frame_extended = frame.extended or default_extended
+                remote, dlc = frame.remote, frame.dlc
+            else:
+                can_id, data = frame[0], frame[1]
+                frame_extended = frame[2] if len(frame) > 2 else default_extended
+            offset = len(buffer)
+            try:
+                length = encode_frame_into(buffer, mode, can_id, data, frame_extended, remote, dlc)
+                results.append(TxResult(offset, length, True))
+                costs.append((offset, self.tx_limiter.cost(len(data), frame_extended)
+                               if self.tx_limiter else 0.0))
+                payloads.append((len(data), frame_extended))
+            except ValueError as e:
+                del buffer[offset:]
+                results.append(TxResult(offset, 0, False, str(e)))
+                payloads.append((0, False))
+        
+        if not buffer:
+            return results
+        
+        try:
+            written = self._paced_write(buffer, costs)
+        except Exception as e:
+            logger.error("✗ CAN batch send failed: %s", e)
+            written = 0
+            error = str(e)
+        else:
+            error = "Write incomplete"
+        
+        # Frames not fully contained in what the port accepted have failed
+        results = [
+            r if not r.success or r.offset + r.length <= written
+            else r._replace(success=False, error=error)
+            for r in results
+        ]
+        sent = sum(1 for r in results if r.success)
+        self.tx_summary.add(sent, written, errors=len(results) - sent)
+        tx_frames = tx_bytes = 0
+        tx_bits = 0.0
+        for (length, frame_extended), r in zip(payloads, results):
+            if r.success:
+                frame_count, bits = payload_bits(length, frame_extended)
+                tx_frames += frame_count
+                tx_bytes += length
+                tx_bits += bits
+        self.bus_load.add('tx', tx_frames, tx_bytes, tx_bits, written)
+        if sent != len(results):
+            logger.warning("✗ CAN batch sent: %s/%s frames, %s bytes", sent, len(results), written)
+        elif frame_logger.isEnabledFor(logging.INFO):
+            frame_logger.info("✓ CAN batch sent: %s frames, %s bytes", sent, written)
+        if self.summary_interval:
+            self.tx_summary.maybe_report(self.summary_interval)
+        return results
+    
+    def _paced_write(self, buffer: bytearray, costs: List[Tuple[int, float]]) -> int:
+        """Write buffer, waiting on tx_limiter before the frames that exceed the budget
+        
+        costs holds (offset, link time) for each encoded frame.
+        """
+        view = memoryview(buffer)
+        written = 0
+        if self.tx_limiter:
+            for offset, cost in costs:
+                delay = self.tx_limiter.reserve(cost)
+                if delay > 0:
+                    if offset > written:
+                        count = self.serial_conn.write(view[written:offset])
+                        written += offset - written if count is None else count
+                        if written < offset:
+                            return written
+                    time.sleep(delay)
+        count = self.serial_conn.write(view[written:])
+        return len(buffer) if count is None else written + count
+    
+    def start_monitoring(self, log_file: Optional[str] = None, capture_file: Optional[str] = None):
+        """Start monitoring CAN traffic
+        
+        log_file receives the CSV text log, capture_file the compact binary
+        capture (see can_capture).
+        """
         self.is_monitoring = True
         self.log_file = log_file
+        self.clock = SessionClock()
         
         if log_file:
-            with open(log_file, 'w') as f:
-                f.write(f"# CAN Monitor Log - {datetime.now()}\n")
-                f.write("# Timestamp,Direction,ID,Data\n")
+            header = (f"# CAN Monitor Log - {datetime.now()}\n"
+                      "# Timestamp,Direction,ID,Data\n")
+            self.log_writer = LogWriter.from_config(log_file, self.logging_config, header=header,
+                                                    **self.log_settings)
+            self.log_writer.start()
+        
+        if capture_file:
+            self.capture_writer = CaptureWriter(capture_file, self.config, self.clock)
+            self.capture_writer.start()
         
         self.monitor_thread = threading.Thread(target=self._monitor_worker)
         self.monitor_thread.daemon = True
         self.monitor_thread.start()
         
-        print("✓ Monitoring started")
+        logger.info("✓ Monitoring started")
     
     def stop_monitoring(self):
         """Stop monitoring CAN traffic"""
         self.is_monitoring = False
-        if self.monitor_thread:
+        if self.monitor_thread and self.monitor_thread is not threading.current_thread():
             self.monitor_thread.join(timeout=1)
-        print("✓ Monitoring stopped")
+        if self.log_writer:
+            self.log_writer.close()
+            if self.log_writer.dropped:
+                logger.warning("⚠ Log writer dropped %s records", self.log_writer.dropped)
+            self.log_writer = None
+        if self.capture_writer:
+            self.capture_writer.close()
+            logger.info("✓ Capture saved: %s frames", self.capture_writer.frames_written)
+            self.capture_writer = None
+        if self.frame_filter and self.frame_filter.rejected:
+            logger.info("✓ Filter passed %s frames, rejected %s",
+                        self.frame_filter.passed, self.frame_filter.rejected)
+        logger.info("Bus load (10 s): %s", self.bus_load.summary(10))
+        if self.supervisor and self.supervisor.outages:
+            stats = self.supervisor.stats()
+            logger.warning("⚠ %s connection losses, %s reconnects, %.2f s without reception",
+                           stats['outages'], stats['reconnects'], stats['downtime_s'])
+        for name, stats in self.bus.stats().items():
+            if stats['dropped']:
+                logger.warning("⚠ Subscriber '%s' dropped %s frames", name, stats['dropped'])
+        logger.info("✓ Monitoring stopped")
     
     def _monitor_worker(self):
         """Monitor worker thread"""
+        reader = SerialReader(self.serial_conn)
+        decoder = FrameDecoder(self.config.work_mode)
+        ring = decoder.ring
+        rx_summary = RateSummary('RX', self.summary_interval or 1.0)
         while self.is_monitoring and self.serial_conn and self.serial_conn.is_open:
             try:
-                if self.serial_conn.in_waiting > 0:
-                    data = self.serial_conn.read(self.serial_conn.in_waiting)
-                    timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-                    
-                    # Parse received data
-                    hex_data = data.hex()
-                    print(f"[{timestamp}] RX: {hex_data}")
-                    
-                    # Log to file if specified
-                    if self.log_file:
-                        with open(self.log_file, 'a') as f:
-                            f.write(f"{timestamp},RX,unknown,{hex_data}\n")
+                # Blocks until bytes arrive and reads them straight into the
+                # ring buffer; the timeout only bounds how long a stop
+                # request can go unnoticed
+                space = ring.writable()
+                count = reader.readinto(space, timeout=0.2)
+                if self.summary_interval and rx_summary.maybe_report():
+                    stats_logger.info("%s", self.bus_load.summary())
+                if not count:
+                    continue
+                received_ns = time.monotonic_ns()
+                if self._response is not None:
+                    # Bytes up to the OK/ERROR line of a pending AT command
+                    # are its response; what follows stays for the decoder
+                    taken = self._route_response(space[:count])
+                    if taken:
+                        space[:count - taken] = bytes(space[taken:count])
+                        count -= taken
+                        if not count:
+                            continue
+                ring.commit(count)
+                discarded = decoder.bytes_discarded
+                # Packed records: no per-frame objects unless text is wanted
+                records = decoder.decode_records(received_ns)
+                frame_count = len(records) // RECORD.size
+                rx_summary.add(frame_count, count, errors=decoder.bytes_discarded - discarded)
+                # Bus load counts everything on the wire, filtered or not
+                self.bus_load.add_records('rx', records, count)
+                if frame_count and self.frame_filter:
+                    records = self.frame_filter.filter_records(records)
+                    frame_count = len(records) // RECORD.size
+                if not frame_count:
+                    continue
                 
-                time.sleep(0.01)  # Small delay to prevent CPU overload
+                # Frame objects and text are built only if someone uses them
+                show = frame_logger.isEnabledFor(logging.INFO)
+                if show or self.log_writer or self.bus.has_subscribers:
+                    frames = [CanFrame.from_record(record) for record in RECORD.iter_unpack(records)]
+                    self.bus.publish(frames)
+                if show or self.log_writer:
+                    # Wall-clock text only for display and the text log
+                    timestamp = self.clock.format(received_ns)
+                    lines = []
+                    for frame in frames:
+                        frame_id = frame.id_text
+                        hex_data = frame.data.hex()
+                        if show:
+                            frame_logger.info("[%s] RX: ID=%s, Data=%s", timestamp, frame_id, hex_data)
+                        lines.append(f"{timestamp},RX,{frame_id},{hex_data}\n")
+                    
+                    # Hand off to the log writer thread; never blocks on disk
+                    if self.log_writer:
+                        self.log_writer.write(''.join(lines))
+                if self.capture_writer:
+                    self.capture_writer.write_records(records)
+            except (serial.SerialException, OSError) as e:
+                gap = None
+                if self.supervisor and self.is_monitoring:
+                    gap = self.supervisor.recover(e, lambda: self.is_monitoring)
+                if gap is None:
+                    logger.error("Monitor error: %s", e)
+                    break
+                self._record_gap(*gap)
+                # A partial frame from before the outage must not be
+                # completed with bytes from after it
+                reader = SerialReader(self.serial_conn)
+                decoder.reset()
             except Exception as e:
-                print(f"Monitor error: {e}")
+                logger.error("Monitor error: %s", e)
                 break
     
+    def _record_gap(self, lost_ns: int, resumed_ns: int):
+        """Mark a reception gap in the text log and the capture"""
+        logger.warning("⚠ Reception gap of %.0f ms", (resumed_ns - lost_ns) / 1e6)
+        if self.log_writer:
+            self.log_writer.write(f"# GAP {self.clock.format(lost_ns)} - {self.clock.format(resumed_ns)}\n")
+        if self.capture_writer:
+            self.capture_writer.write_gap(lost_ns, resumed_ns)
+    
     def save_config_to_file(self, filename: str):
         """Save configuration to JSON file"""
         try:
             with open(filename, 'w') as f:
                 json.dump(asdict(self.config), f, indent=2, default=str)
-            print(f"✓ Configuration saved to {filename}")
+            logger.info("✓ Configuration saved to %s", filename)
         except Exception as e:
-            print(f"✗ Failed to save config: {e}")
+            logger.error("✗ Failed to save config: %s", e)
     
     def load_config_from_file(self, filename: str):
         """Load configuration from JSON file"""
@@ -320,67 +783,186 @@ class WaveshareCANTool:
                         value = FrameType(value)
                     setattr(self.config, key, value)
             
-            print(f"✓ Configuration loaded from {filename}")
+            logger.info("✓ Configuration loaded from %s", filename)
         except Exception as e:
-            print(f"✗ Failed to load config: {e}")
+            logger.error("✗ Failed to load config: %s", e)
     
-    def apply_config(self) -> bool:
-        """Apply current configuration to device"""
+    def apply_config(self, force: bool = False, save: bool = True) -> bool:
+        """Apply current configuration to device
+        
+        Only settings that differ from the last configuration the device
+        confirmed are sent, and AT+SAVE is skipped when nothing changed.
+        force=True resends everything. save=False leaves flash alone and
+        unsaved_changes as it was (restoring settings after a reconnect).
+        """
         success = True
+        was_unsaved = self.unsaved_changes
+        shadow = None if force else self.device_shadow
+        
+        def changed(*fields):
+            return shadow is None or any(
+                getattr(shadow, name) != getattr(self.config, name) for name in fields
+            )
         
-        print("Applying configuration to device...")
+        logger.info("Applying configuration to device...")
+        sent = False
         
         # Configure UART
-        if not self.configure_uart(
-            self.config.uart_baud,
-            self.config.uart_data_bits,
-            self.config.uart_stop_bits,
-            self.config.uart_parity
-        ):
-            success = False
+        if changed('uart_baud', 'uart_data_bits', 'uart_stop_bits', 'uart_parity'):
+            sent = True
+            if not self.configure_uart(
+                self.config.uart_baud,
+                self.config.uart_data_bits,
+                self.config.uart_stop_bits,
+                self.config.uart_parity
+            ):
+                success = False
         
         # Configure CAN
-        if not self.configure_can(
-            self.config.can_baud,
-            self.config.can_frame_type
-        ):
-            success = False
+        if changed('can_baud', 'can_frame_type'):
+            sent = True
+            if not self.configure_can(
+                self.config.can_baud,
+                self.config.can_frame_type
+            ):
+                success = False
         
         # Set work mode
-        if not self.set_work_mode(self.config.work_mode):
-            success = False
+        if changed('work_mode'):
+            sent = True
+            if not self.set_work_mode(self.config.work_mode):
+                success = False
         
         # Set CAN filter
-        if not self.set_can_filter(
-            self.config.can_filter_id,
-            self.config.can_filter_mask
-        ):
-            success = False
+        if changed('can_filter_id', 'can_filter_mask'):
+            sent = True
+            if not self.set_can_filter(
+                self.config.can_filter_id,
+                self.config.can_filter_mask
+            ):
+                success = False
+        
+        if not sent:
+            logger.info("✓ Device already matches configuration")
         
         # Save to device
-        if success and not self.save_config():
+        if not save:
+            self.unsaved_changes = was_unsaved
+        elif success and self.unsaved_changes and not self.save_config():
             success = False
         
+        if success:
+            self.device_shadow = replace(self.config)
+        if sent:
+            # AT+STATUS in the cached identification reports the old settings
+            self.invalidate_device_info()
+        
         return success
 
 
+def run_cyclic(tool: WaveshareCANTool, cyclic: List[List[str]], test_config: Optional[str],
+               test_interval: str, duration: float):
+    """Run scheduled transmissions for duration seconds and print timing stats"""
+    testing: Dict[str, Any] = {}
+    if test_config:
+        with open(test_config) as f:
+            testing = json.load(f).get('testing', {})
+        scheduler = TxScheduler.from_test_config(tool.send_can_frames, testing, test_interval)
+    else:
+        scheduler = TxScheduler(tool.send_can_frames)
+    
+    intervals = testing.get('test_intervals', {})
+    for can_id, data, period in cyclic:
+        period_ms = intervals[period] if period in intervals else float(period)
+        scheduler.add(int(can_id, 16), bytes.fromhex(data), period_ms / 1000.0)
+    
+    if tool.tx_limiter:
+        tool.tx_limiter.reset_stats()
+    scheduler.start()
+    try:
+        print(f"Cyclic transmission for {duration:g}s... Press Ctrl+C to stop")
+        time.sleep(duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        scheduler.stop()
+    
+    if tool.tx_limiter:
+        stats = tool.tx_limiter.stats()
+        print(f"  Link: {stats['frames_per_s']:.0f} frames/s of {stats['max_frames_per_s']:.0f} max, "
+              f"{stats['link_load']:.0%} load, {stats['headroom']:.0%} headroom, "
+              f"{stats['throttled_s']:.2f}s throttled")
+    for name, stats in scheduler.stats().items():
+        print(f"  {name}: {stats['sent']} sent, {stats['failed']} failed, "
+              f"{stats['overruns']} overruns, jitter {stats['jitter_mean_us']:.0f}us mean / "
+              f"{stats['jitter_max_us']:.0f}us max")
+
+
 def main():
     """Main function for command-line interface"""
     import argparse
     
     parser = argparse.ArgumentParser(description="Waveshare CAN Tool - Python Edition")
-    parser.add_argument('--port', default='/dev/tty.usbserial-1140', help='Serial port')
+    parser.add_argument('--port', default='/dev/tty.usbserial-1140',
+                        help="Serial port, or 'auto' to use the first converter found")
+    parser.add_argument('--discover', action='store_true', help='Probe all USB serial ports for converters')
     parser.add_argument('--info', action='store_true', help='Get device information')
     parser.add_argument('--config', help='Configuration file to load')
     parser.add_argument('--monitor', action='store_true', help='Start monitoring mode')
     parser.add_argument('--log', help='Log file for monitoring')
+    parser.add_argument('--capture', help='Binary capture file for monitoring')
+    parser.add_argument('--accept', nargs='+', metavar='ID',
+                        help='Only monitor these IDs (0x123, 0x100-0x1FF or id/mask like 0x600/0x780)')
+    parser.add_argument('--reject', nargs='+', metavar='ID', help='Never monitor these IDs')
+    parser.add_argument('--detect-can-baud', action='store_true',
+                        help='Find the CAN bus bit rate by listening at each standard rate')
+    parser.add_argument('--hw-filter', nargs='+', metavar='ID',
+                        help='Program the device filter to accept these IDs (hex) with the fewest extra IDs')
     parser.add_argument('--send', nargs=2, metavar=('ID', 'DATA'), help='Send CAN frame')
+    parser.add_argument('--cyclic', nargs=3, action='append', metavar=('ID', 'DATA', 'PERIOD'),
+                        help='Send a frame periodically (PERIOD in ms or a testing.test_intervals name); repeatable')
+    parser.add_argument('--test-config', help='Send testing.test_frames from this windows_config.json')
+    parser.add_argument('--test-interval', default='medium', help='testing.test_intervals entry for --test-config')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds to run cyclic transmission')
+    parser.add_argument('--no-pace', action='store_true',
+                        help='Do not limit transmission to the CAN/UART bandwidth')
     parser.add_argument('--reset', action='store_true', help='Reset device')
+    parser.add_argument('--retries', type=int, default=3,
+                        help='Reconnect attempts at the full backoff delay before giving up (0 = forever)')
+    parser.add_argument('--no-reconnect', action='store_true', help='Stop monitoring when the port fails')
+    parser.add_argument('--quiet', action='store_true',
+                        help='High-throughput mode: periodic summaries instead of per-frame output')
+    parser.add_argument('--verbose', action='store_true', help='Show debug events')
     
     args = parser.parse_args()
+    configure_logging(logging.DEBUG if args.verbose else logging.INFO, quiet=args.quiet)
+    
+    if args.discover or args.port == 'auto':
+        from port_discovery import PortDiscovery
+        found = PortDiscovery().discover(first=not args.discover)
+        if args.discover:
+            for device in found:
+                print(f"  {device.port}: {device.baud} baud, firmware={device.firmware}, "
+                      f"mode={device.mode}, key={device.key} ({device.elapsed * 1000:.0f} ms)")
+            return 0 if found else 1
+        if not found:
+            logger.error("✗ No converter found")
+            return 1
     
     # Create tool instance
-    tool = WaveshareCANTool(args.port)
+    tool = WaveshareCANTool(found[0].port if args.port == 'auto' else args.port)
+    if args.port == 'auto':
+        tool.baudrate = found[0].baud
+    if args.quiet:
+        tool.summary_interval = 1.0
+    if args.no_pace:
+        tool.tx_limiter = None
+    if args.no_reconnect:
+        tool.supervisor = None
+    else:
+        tool.supervisor.policy.max_retries = args.retries
+    if args.accept or args.reject:
+        tool.frame_filter = FrameFilter(args.accept or [], args.reject or [])
     
     if not tool.connect():
         return 1
@@ -399,13 +981,28 @@ def main():
         if args.reset:
             tool.reset_device()
         
+        if args.detect_can_baud:
+            detection = tool.detect_can_baud()
+            for sample in detection.samples:
+                print(f"  {sample.bitrate:>7} bps: {sample.frames} frames, {sample.garbage} garbage bytes, "
+                      f"{sample.dwell * 1000:.0f} ms")
+            if detection.bitrate is None:
+                return 1
+            print(f"CAN bit rate: {detection.bitrate} bps (confidence {detection.confidence:.0%})")
+        
+        if args.hw_filter:
+            tool.set_can_filter_ids(int(can_id, 16) for can_id in args.hw_filter)
+        
         if args.send:
             can_id = int(args.send[0], 16)
             data = bytes.fromhex(args.send[1])
             tool.send_can_frame(can_id, data)
         
+        if args.cyclic or args.test_config:
+            run_cyclic(tool, args.cyclic or [], args.test_config, args.test_interval, args.duration)
+        
         if args.monitor:
-            tool.start_monitoring(args.log)
+            tool.start_monitoring(args.log, args.capture)
             try:
                 print("Monitoring... Press Ctrl+C to stop")
                 while True:
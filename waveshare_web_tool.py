@@ -12,6 +12,10 @@ import threading
 import webbrowser
 import time
 from waveshare_can_tool import WaveshareCANTool, WorkMode, FrameType
+from event_log import configure_logging
+
+# Endpoints without side effects; everything else must be POSTed
+GET_ENDPOINTS = ('/api/monitor/data', '/api/stats')
 
 
 class WebInterface:
@@ -20,6 +24,7 @@ class WebInterface:
         self.tool = WaveshareCANTool()
         self.server = None
         self.running = False
+        self.monitor_subscription = None
         
     def get_html_page(self):
         """Generate HTML page"""
@@ -362,6 +367,9 @@ class WebInterface:
                 return {'success': success, 'error': None if success else 'Connection failed'}
             
             elif path == '/api/disconnect':
+                if self.monitor_subscription is not None:
+                    self.tool.bus.unsubscribe(self.monitor_subscription)
+                    self.monitor_subscription = None
                 self.tool.disconnect()
                 return {'success': True}
             
@@ -383,16 +391,36 @@ class WebInterface:
                 return {'success': True}
             
             elif path == '/api/monitor/start':
-                self.tool.start_monitoring()
+                if self.monitor_subscription is None:
+                    self.monitor_subscription = self.tool.bus.subscribe('web', policy='drop_oldest')
+                if not self.tool.is_monitoring:
+                    self.tool.start_monitoring()
                 return {'success': True}
             
             elif path == '/api/monitor/stop':
+                if self.monitor_subscription is not None:
+                    self.tool.bus.unsubscribe(self.monitor_subscription)
+                    self.monitor_subscription = None
                 self.tool.stop_monitoring()
                 return {'success': True}
             
             elif path == '/api/monitor/data':
-                # Return mock data for now
-                return {'data': []}
+                subscription = self.monitor_subscription
+                if subscription is None:
+                    return {'data': [], 'dropped': 0}
+                clock = self.tool.clock
+                lines = [f"[{clock.format(frame.timestamp_ns)}] RX: ID={frame.id_text}, Data={frame.data.hex()}"
+                         for frame in subscription.get_many(1000)]
+                return {'data': lines, 'dropped': subscription.dropped}
+            
+            elif path == '/api/stats':
+                stats = {
+                    'bus_load': self.tool.bus_load.snapshot(),
+                    'subscribers': self.tool.bus.stats(),
+                }
+                if self.tool.tx_limiter:
+                    stats['tx_limiter'] = self.tool.tx_limiter.stats()
+                return stats
             
             elif path == '/api/send':
                 can_id = int(data['id'], 16)
@@ -419,6 +447,21 @@ class WebInterface:
                     self.send_header('Content-type', 'text/html')
                     self.end_headers()
                     self.wfile.write(self.web_interface.get_html_page().encode())
+                elif self.path in GET_ENDPOINTS:
+                    response = self.web_interface.handle_api_request(self.path, 'GET', {})
+                    
+                    self.send_response(200)
+                    self.send_header('Content-type', 'application/json')
+                    self.end_headers()
+                    self.wfile.write(json.dumps(response).encode())
+                elif self.path.startswith('/api/'):
+                    response = {'success': False, 'error': 'Method not allowed, use POST'}
+                    
+                    self.send_response(405)
+                    self.send_header('Allow', 'POST')
+                    self.send_header('Content-type', 'application/json')
+                    self.end_headers()
+                    self.wfile.write(json.dumps(response).encode())
                 else:
                     super().do_GET()
             
@@ -462,6 +505,7 @@ class WebInterface:
 
 def main():
     """Main function"""
+    configure_logging()
     interface = WebInterface()
     interface.run()
 